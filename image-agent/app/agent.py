@@ -26,14 +26,14 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from tools.gemini_image_gen import generate_image_gemini
+from tools.batch import generate_images_batch, upscale_images_batch
 from tools.upscale import upscale_image
+from tools.jobs import check_image_job
 from tools.artifacts import download_file_from_url, load_image_from_artifact
 
-import os
-import google.auth
-
-_, project_id = google.auth.default()
-os.environ["GOOGLE_CLOUD_PROJECT"] = project_id
+# The project is resolved from Application Default Credentials on first model
+# call (tools.clients.resolve_project), not at import: google.auth.default()
+# can hit the metadata server and would slow every cold start and reload.
 os.environ["GOOGLE_CLOUD_LOCATION"] = "global"
 os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "True"
 
@@ -47,6 +47,7 @@ Capabilities:
     - Standard upscale factor is 4.0 (to 4K).
     - If the image is too large, you can upscale it to 2K by setting the `scale_factor` parameter to 2.
     - If the image was previously generated in 4k, you can not upscale it further.
+    - The tool checks the image dimensions itself: it lowers x4 to x2 when needed, upscales very large images in tiles, and refuses images whose result would be too large. Relay the dimensions it reports.
 
 2.  **Artifact Handling**:
     - `download_file_from_url`: Download files from URLs to artifacts.
@@ -56,6 +57,17 @@ Capabilities:
     - Use this when the user asks for "reasoning", "thinking", "infographic", or complex layouts.
     - Parameters: aspect ratio.
 
+4.  **Generate Several Images**: Use `generate_images_batch` when the user wants multiple images or variations.
+    - Pass all prompts (and optional per-prompt aspect ratios) in a single call instead of calling `generate_image_gemini` repeatedly.
+    - The result lists the status and artifact name of every item; report any failed items to the user.
+
+5.  **Upscale Several Images**: Use `upscale_images_batch` when the user asks to upscale several (or "all of these") images.
+    - Pass every artifact name in a single call instead of calling `upscale_image` repeatedly.
+
+6.  **Background Jobs**: 4K generations and upscales can take about a minute.
+    - When the user does not need the result right away, pass `background=True` to `generate_image_gemini` or `upscale_image`; the tool returns a job ID immediately.
+    - Give the user the job ID and use `check_image_job` (with that ID) to report its status and the artifact names once it is done.
+
 Interaction Style:
 - Be helpful and creative.
 - When an image is generated or upscaled, provide the path clearly.
@@ -70,7 +82,7 @@ root_agent = Agent(
         retry_options=types.HttpRetryOptions(attempts=3),
     ),
     instruction=system_instructions,
-    tools=[upscale_image, download_file_from_url, load_image_from_artifact, generate_image_gemini],
+    tools=[upscale_image, download_file_from_url, load_image_from_artifact, generate_image_gemini, generate_images_batch, upscale_images_batch, check_image_job],
 )
 
 app = App(root_agent=root_agent, name="app")
@@ -18,10 +18,11 @@ from typing import Any
 import vertexai
 from dotenv import load_dotenv
 from google.adk.artifacts import GcsArtifactService, InMemoryArtifactService
-from google.cloud import logging as google_cloud_logging
 from vertexai.agent_engines.templates.adk import AdkApp
 
 from app.agent import app as adk_app
+from app.app_utils.artifact_cache import build_tiered_artifact_service
+from app.app_utils.feedback import build_feedback_writer
 from app.app_utils.telemetry import setup_telemetry
 from app.app_utils.typing import Feedback
 
@@ -36,15 +37,38 @@ class AgentEngineApp(AdkApp):
         setup_telemetry()
         super().set_up()
         logging.basicConfig(level=logging.INFO)
+        # Imported here so loading the module (and deploy-time introspection)
+        # does not pay for the Cloud Logging client library.
+        from google.cloud import logging as google_cloud_logging
+
         logging_client = google_cloud_logging.Client()
         self.logger = logging_client.logger(__name__)
+        self.feedback_writer = build_feedback_writer(self.logger)
         if gemini_location:
             os.environ["GOOGLE_CLOUD_LOCATION"] = gemini_location
+        self._warm_up()
+
+    def _warm_up(self) -> None:
+        """Pre-create shared clients and connections so the first request is fast.
+
+        Configured with WARMUP_ENABLED, WARMUP_STEPS and WARMUP_TIMEOUT_S; the
+        per-step outcome is kept in `self.warmup_report`.
+        """
+        # `tools` is importable once app.agent has put app/ on sys.path.
+        from tools.warmup import warm_up
+
+        self.warmup_report = warm_up(
+            artifact_service=self._tmpl_attrs.get("artifact_service")
+        )
 
     def register_feedback(self, feedback: dict[str, Any]) -> None:
-        """Collect and log feedback."""
+        """Collect and log feedback.
+
+        Validation happens inline; the write is queued and sent to Cloud Logging
+        in batches by a background thread, so it never waits on the network.
+        """
         feedback_obj = Feedback.model_validate(feedback)
-        self.logger.log_struct(feedback_obj.model_dump(), severity="INFO")
+        self.feedback_writer.submit(feedback_obj.model_dump())
 
     def register_operations(self) -> dict[str, list[str]]:
         """Registers the operations of the Agent."""
@@ -58,7 +82,7 @@ logs_bucket_name = os.environ.get("LOGS_BUCKET_NAME")
 agent_engine = AgentEngineApp(
     app=adk_app,
     artifact_service_builder=lambda: (
-        GcsArtifactService(bucket_name=logs_bucket_name)
+        build_tiered_artifact_service(GcsArtifactService(bucket_name=logs_bucket_name))
         if logs_bucket_name
         else InMemoryArtifactService()
     ),
@@ -0,0 +1,364 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from google.adk.artifacts import BaseArtifactService
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+ArtifactKey = tuple[str, str, str | None, str, int]
+LatestKey = tuple[str, str, str | None, str]
+
+
+def _scope(session_id: str | None, filename: str) -> str | None:
+    # "user:" artifacts are shared across a user's sessions.
+    return None if filename.startswith("user:") else session_id
+
+
+class _Counters:
+    """Cache statistics, mirrored to OpenTelemetry when it is available."""
+
+    def __init__(self) -> None:
+        self.values: dict[str, int] = {}
+        self._lock = threading.Lock()
+        try:
+            from opentelemetry import metrics
+
+            self._meter = metrics.get_meter("image_agent.artifact_cache")
+        except ImportError:
+            self._meter = None
+        self._instruments: dict[str, Any] = {}
+
+    def incr(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.values[name] = self.values.get(name, 0) + value
+            if self._meter is not None and name not in self._instruments:
+                self._instruments[name] = self._meter.create_counter(
+                    f"artifact_cache.{name}"
+                )
+            instrument = self._instruments.get(name)
+        if instrument is not None:
+            instrument.add(value)
+
+
+class TieredArtifactService(BaseArtifactService):
+    """Write-through local cache in front of another artifact service.
+
+    Saves go to the backend first and are then kept in a bounded in-memory LRU
+    (and, optionally, a bounded on-disk LRU). Loads are served locally when
+    possible and fall back to the backend on a miss. Versioned artifacts are
+    immutable, so they are cached by explicit version indefinitely. A load of
+    the latest version first lists the backend's versions, a metadata-only
+    call, and then serves or fetches that exact version, so writes from other
+    instances are never hidden behind a stale local copy.
+    """
+
+    def __init__(
+        self,
+        backend: BaseArtifactService,
+        max_memory_bytes: int = 256 * 1024 * 1024,
+        disk_dir: str | None = None,
+        max_disk_bytes: int = 2 * 1024 * 1024 * 1024,
+    ) -> None:
+        self.backend = backend
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory: OrderedDict[ArtifactKey, types.Part] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: OrderedDict[ArtifactKey, tuple[str, str, int]] = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.counters = _Counters()
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            # Entries from a previous process are not indexed; drop them.
+            for name in os.listdir(disk_dir):
+                if name.endswith(".artifact"):
+                    os.remove(os.path.join(disk_dir, name))
+
+    # ------------------------------------------------------------------
+    # Local tiers
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _size(artifact: types.Part) -> int:
+        return len(artifact.inline_data.data or b"")
+
+    def _memory_put(self, key: ArtifactKey, artifact: types.Part) -> None:
+        size = self._size(artifact)
+        if size > self.max_memory_bytes:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= self._size(previous)
+            self._memory[key] = artifact
+            self._memory_bytes += size
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= self._size(evicted)
+                self.counters.incr("memory_evictions")
+
+    def _memory_get(self, key: ArtifactKey) -> types.Part | None:
+        with self._lock:
+            artifact = self._memory.get(key)
+            if artifact is not None:
+                self._memory.move_to_end(key)
+            return artifact
+
+    def _disk_path(self, key: ArtifactKey) -> str:
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.artifact")
+
+    def _disk_put(self, key: ArtifactKey, artifact: types.Part) -> None:
+        data = artifact.inline_data.data or b""
+        if not self.disk_dir or len(data) > self.max_disk_bytes:
+            return
+        path = self._disk_path(key)
+        with open(path, "wb") as f:
+            f.write(data)
+        evicted_paths = []
+        with self._lock:
+            previous = self._disk.pop(key, None)
+            if previous is not None:
+                self._disk_bytes -= previous[2]
+            self._disk[key] = (path, artifact.inline_data.mime_type, len(data))
+            self._disk_bytes += len(data)
+            while self._disk_bytes > self.max_disk_bytes:
+                _, (old_path, _, old_size) = self._disk.popitem(last=False)
+                self._disk_bytes -= old_size
+                evicted_paths.append(old_path)
+                self.counters.incr("disk_evictions")
+        for old_path in evicted_paths:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+    def _disk_get(self, key: ArtifactKey) -> types.Part | None:
+        with self._lock:
+            entry = self._disk.get(key)
+            if entry is not None:
+                self._disk.move_to_end(key)
+        if entry is None:
+            return None
+        path, mime_type, _ = entry
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            with self._lock:
+                self._disk.pop(key, None)
+            return None
+        return types.Part(inline_data=types.Blob(mime_type=mime_type, data=data))
+
+    async def _store(self, key: ArtifactKey, artifact: types.Part) -> None:
+        if not artifact.inline_data:
+            return
+        self._memory_put(key, artifact)
+        if self.disk_dir:
+            try:
+                await asyncio.to_thread(self._disk_put, key, artifact)
+            except OSError as e:
+                logger.warning(f"Artifact disk cache write failed: {e}")
+
+    def _forget(self, latest_key: LatestKey) -> None:
+        with self._lock:
+            for key in [k for k in self._memory if k[:4] == latest_key]:
+                self._memory_bytes -= self._size(self._memory.pop(key))
+            for key in [k for k in self._disk if k[:4] == latest_key]:
+                path, _, size = self._disk.pop(key)
+                self._disk_bytes -= size
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    # ------------------------------------------------------------------
+    # BaseArtifactService
+    # ------------------------------------------------------------------
+    async def save_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        artifact: types.Part,
+        session_id: str | None = None,
+        **kwargs: Any,
+    ) -> int:
+        version = await self.backend.save_artifact(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            filename=filename,
+            artifact=artifact,
+            **kwargs,
+        )
+        latest_key = (app_name, user_id, _scope(session_id, filename), filename)
+        await self._store((*latest_key, version), artifact)
+        self.counters.incr("writes")
+        return version
+
+    async def load_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        session_id: str | None = None,
+        version: int | None = None,
+        **kwargs: Any,
+    ) -> types.Part | None:
+        latest_key = (app_name, user_id, _scope(session_id, filename), filename)
+        resolved = version
+        if resolved is None:
+            # Resolve "latest" before loading so the bytes fetched below are
+            # exactly the version they are cached under, even if another
+            # instance saves a newer one in between.
+            versions = await self.backend.list_versions(
+                app_name=app_name,
+                user_id=user_id,
+                session_id=session_id,
+                filename=filename,
+            )
+            self.counters.incr("version_checks")
+            if not versions:
+                self.counters.incr("misses")
+                return await self.backend.load_artifact(
+                    app_name=app_name,
+                    user_id=user_id,
+                    session_id=session_id,
+                    filename=filename,
+                    **kwargs,
+                )
+            resolved = max(versions)
+
+        key = (*latest_key, resolved)
+        artifact = self._memory_get(key)
+        if artifact is not None:
+            self.counters.incr("memory_hits")
+            return artifact
+        if self.disk_dir:
+            artifact = await asyncio.to_thread(self._disk_get, key)
+            if artifact is not None:
+                self.counters.incr("disk_hits")
+                self._memory_put(key, artifact)
+                return artifact
+
+        self.counters.incr("misses")
+        artifact = await self.backend.load_artifact(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            filename=filename,
+            version=resolved,
+            **kwargs,
+        )
+        if artifact is not None:
+            await self._store(key, artifact)
+        return artifact
+
+    async def list_artifact_keys(
+        self, *, app_name: str, user_id: str, session_id: str | None = None, **kwargs: Any
+    ) -> list[str]:
+        return await self.backend.list_artifact_keys(
+            app_name=app_name, user_id=user_id, session_id=session_id, **kwargs
+        )
+
+    async def delete_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        session_id: str | None = None,
+        **kwargs: Any,
+    ) -> None:
+        await self.backend.delete_artifact(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            filename=filename,
+            **kwargs,
+        )
+        self._forget((app_name, user_id, _scope(session_id, filename), filename))
+
+    async def list_versions(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        session_id: str | None = None,
+        **kwargs: Any,
+    ) -> list[int]:
+        return await self.backend.list_versions(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            filename=filename,
+            **kwargs,
+        )
+
+    async def list_artifact_versions(self, **kwargs: Any) -> Any:
+        return await self.backend.list_artifact_versions(**kwargs)
+
+    async def get_artifact_version(self, **kwargs: Any) -> Any:
+        return await self.backend.get_artifact_version(**kwargs)
+
+    def stats(self) -> dict[str, int]:
+        """Hit/miss/eviction counters and current tier sizes."""
+        with self._lock:
+            return {
+                **self.counters.values,
+                "memory_bytes": self._memory_bytes,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+                "disk_entries": len(self._disk),
+            }
+
+
+def build_tiered_artifact_service(
+    backend: BaseArtifactService,
+) -> BaseArtifactService:
+    """Wraps `backend` in a TieredArtifactService configured from the environment.
+
+    ARTIFACT_CACHE_ENABLED: "true" (default) / "false".
+    ARTIFACT_CACHE_MAX_BYTES: memory tier limit (default 256 MiB).
+    ARTIFACT_CACHE_DISK_DIR: enables the disk tier in this directory.
+    ARTIFACT_CACHE_MAX_DISK_BYTES: disk tier limit (default 2 GiB).
+    """
+    if os.environ.get("ARTIFACT_CACHE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return backend
+    return TieredArtifactService(
+        backend,
+        max_memory_bytes=int(
+            os.environ.get("ARTIFACT_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+        ),
+        disk_dir=os.environ.get("ARTIFACT_CACHE_DISK_DIR") or None,
+        max_disk_bytes=int(
+            os.environ.get("ARTIFACT_CACHE_MAX_DISK_BYTES", 2 * 1024 * 1024 * 1024)
+        ),
+    )
@@ -0,0 +1,203 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Protocol
+
+logger = logging.getLogger(__name__)
+
+
+class FeedbackSink(Protocol):
+    def write_batch(self, entries: list[dict[str, Any]]) -> None: ...
+
+
+class CloudLoggingSink:
+    """Writes each batch to Cloud Logging in a single API call."""
+
+    def __init__(self, cloud_logger: Any) -> None:
+        self.cloud_logger = cloud_logger
+
+    def write_batch(self, entries: list[dict[str, Any]]) -> None:
+        with self.cloud_logger.batch() as batch:
+            for entry in entries:
+                batch.log_struct(entry, severity="INFO")
+
+
+class LocalFeedbackSink:
+    """Keeps batches in memory, for tests and local runs (FEEDBACK_SINK=local)."""
+
+    def __init__(self) -> None:
+        self.batches: list[list[dict[str, Any]]] = []
+        self._lock = threading.Lock()
+
+    def write_batch(self, entries: list[dict[str, Any]]) -> None:
+        with self._lock:
+            self.batches.append(list(entries))
+
+    @property
+    def entries(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [entry for batch in self.batches for entry in batch]
+
+
+class BatchedFeedbackWriter:
+    """Moves feedback writes off the request path.
+
+    `submit` only appends to a bounded in-memory buffer. A background thread
+    writes batches to the sink when `max_batch_size` entries are waiting or
+    `flush_interval_s` has passed since the last write, whichever comes
+    first. When the buffer is full new entries are dropped and counted rather
+    than blocking the caller. `close` (also run at interpreter exit) writes
+    whatever is still buffered.
+    """
+
+    def __init__(
+        self,
+        sink: FeedbackSink,
+        max_batch_size: int = 50,
+        flush_interval_s: float = 5.0,
+        max_buffered: int = 1000,
+    ) -> None:
+        self.sink = sink
+        self.max_batch_size = max_batch_size
+        self.flush_interval_s = flush_interval_s
+        self.max_buffered = max_buffered
+
+        self._buffer: deque[dict[str, Any]] = deque()
+        self._in_flight = 0
+        self._flush_requested = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self.counters = {
+            "submitted": 0,
+            "written": 0,
+            "dropped": 0,
+            "write_errors": 0,
+            "batches": 0,
+        }
+
+        self._thread = threading.Thread(
+            target=self._run, name="feedback-writer", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, entry: dict[str, Any]) -> bool:
+        """Queues one entry without blocking; False if it was dropped."""
+        with self._cond:
+            if self._closed or len(self._buffer) >= self.max_buffered:
+                self.counters["dropped"] += 1
+                dropped = self.counters["dropped"]
+                if dropped & (dropped - 1) == 0:  # 1, 2, 4, 8, ... to avoid log floods
+                    logger.warning(f"Feedback buffer full; {dropped} entries dropped so far")
+                return False
+            self._buffer.append(entry)
+            self.counters["submitted"] += 1
+            if len(self._buffer) >= self.max_batch_size:
+                self._cond.notify_all()
+        return True
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval_s
+                while (
+                    not self._closed
+                    and not self._flush_requested
+                    and len(self._buffer) < self.max_batch_size
+                ):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                count = min(len(self._buffer), self.max_batch_size)
+                batch = [self._buffer.popleft() for _ in range(count)]
+                if not self._buffer:
+                    self._flush_requested = False
+                self._in_flight = len(batch)
+                if not batch and self._closed:
+                    self._cond.notify_all()
+                    return
+
+            if batch:
+                self._write(batch)
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+
+    def _write(self, batch: list[dict[str, Any]]) -> None:
+        try:
+            self.sink.write_batch(batch)
+        except Exception as e:
+            logger.error(f"Dropping {len(batch)} feedback entries after write failure: {e}")
+            with self._cond:
+                self.counters["write_errors"] += 1
+                self.counters["dropped"] += len(batch)
+            return
+        with self._cond:
+            self.counters["written"] += len(batch)
+            self.counters["batches"] += 1
+
+    def flush(self, timeout_s: float = 10.0) -> bool:
+        """Writes everything buffered now; True if it finished within the timeout."""
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(
+                lambda: not self._buffer and not self._in_flight, timeout_s
+            )
+
+    def close(self, timeout_s: float = 10.0) -> None:
+        """Stops accepting entries and drains the buffer. Safe to call twice."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout_s)
+        if self._thread.is_alive():
+            logger.warning(
+                f"Feedback writer did not drain within {timeout_s}s; "
+                f"{len(self._buffer)} entries lost"
+            )
+
+    def stats(self) -> dict[str, int]:
+        """Submission, write and drop counters plus the current buffer depth."""
+        with self._cond:
+            return {**self.counters, "buffered": len(self._buffer)}
+
+
+def build_feedback_writer(cloud_logger: Any) -> BatchedFeedbackWriter:
+    """Creates the feedback writer configured from the environment.
+
+    FEEDBACK_SINK: "cloud_logging" (default) or "local".
+    FEEDBACK_BATCH_SIZE: entries per write (default 50).
+    FEEDBACK_FLUSH_INTERVAL_S: longest an entry waits before a write (5s).
+    FEEDBACK_MAX_BUFFERED: buffered entries before new ones are dropped (1000).
+    """
+    if os.environ.get("FEEDBACK_SINK", "cloud_logging").lower() == "local":
+        sink: FeedbackSink = LocalFeedbackSink()
+    else:
+        sink = CloudLoggingSink(cloud_logger)
+    return BatchedFeedbackWriter(
+        sink,
+        max_batch_size=int(os.environ.get("FEEDBACK_BATCH_SIZE", 50)),
+        flush_interval_s=float(os.environ.get("FEEDBACK_FLUSH_INTERVAL_S", 5)),
+        max_buffered=int(os.environ.get("FEEDBACK_MAX_BUFFERED", 1000)),
+    )
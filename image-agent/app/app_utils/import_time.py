@@ -0,0 +1,136 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cold-start benchmark for the Agent Engine entrypoint.
+
+Imports `app.agent_engine_app.agent_engine` in fresh interpreters, reports the
+median time until the object exists plus a per-module `-X importtime`
+breakdown, and exits non-zero when the median exceeds the budget.
+
+Constructing `agent_engine` is not free of network calls: AdkApp.__init__ reads
+the vertexai initializer's project, which calls google.auth.default() and,
+when GOOGLE_CLOUD_PROJECT is set, asks Resource Manager for the project ID.
+The default run measures that real path and needs Application Default
+Credentials. `--offline` configures vertexai with a placeholder project and
+anonymous credentials first, so only imports and construction are timed.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+import click
+
+ENTRYPOINT = "app.agent_engine_app"
+_READY_MARKER = "AGENT_ENGINE_READY_S="
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _probe_source(offline: bool) -> str:
+    lines = ["import time", "started = time.perf_counter()"]
+    if offline:
+        lines += [
+            "import vertexai",
+            "from google.auth.credentials import AnonymousCredentials",
+            "vertexai.init(project='import-time-probe', credentials=AnonymousCredentials())",
+        ]
+    lines += [
+        f"from {ENTRYPOINT} import agent_engine",
+        f"print('{_READY_MARKER}' + str(time.perf_counter() - started))",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def parse_importtime(stderr: str) -> list[tuple[int, int, str]]:
+    """Parses `-X importtime` output into (self_us, cumulative_us, module) rows."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue  # header row
+        rows.append((self_us, cumulative_us, fields[2].rstrip()))
+    return rows
+
+
+def _run_probe(importtime: bool, offline: bool = False) -> subprocess.CompletedProcess:
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    return subprocess.run(
+        [*command, "-c", _probe_source(offline)],
+        capture_output=True,
+        text=True,
+        cwd=PROJECT_ROOT,
+        env=os.environ.copy(),
+        check=True,
+    )
+
+
+def _ready_seconds(stdout: str) -> float:
+    for line in stdout.splitlines():
+        if line.startswith(_READY_MARKER):
+            return float(line[len(_READY_MARKER) :])
+    raise click.ClickException(f"Probe did not report readiness:\n{stdout}")
+
+
+@click.command()
+@click.option(
+    "--max-seconds",
+    type=float,
+    default=lambda: float(os.environ.get("IMPORT_TIME_BUDGET_S", "10")),
+    show_default="IMPORT_TIME_BUDGET_S or 10",
+    help="Fail when the median time to `agent_engine` exceeds this.",
+)
+@click.option("--runs", default=3, show_default=True, help="Timed runs.")
+@click.option("--top", default=25, show_default=True, help="Modules to list.")
+@click.option(
+    "--offline",
+    is_flag=True,
+    help="Skip credential and project lookups; time imports and construction only.",
+)
+def main(max_seconds: float, runs: int, top: int, offline: bool) -> None:
+    """Measure cold import time of the agent entrypoint."""
+    try:
+        breakdown = _run_probe(importtime=True, offline=offline)
+        timings = [_ready_seconds(_run_probe(importtime=False, offline=offline).stdout) for _ in range(runs)]
+    except subprocess.CalledProcessError as e:
+        raise click.ClickException(f"Importing {ENTRYPOINT} failed:\n{e.stderr}") from e
+
+    rows = parse_importtime(breakdown.stderr)
+    click.echo(f"Slowest {top} of {len(rows)} imports (cumulative):")
+    click.echo(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for self_us, cumulative_us, module in sorted(rows, key=lambda r: r[1], reverse=True)[:top]:
+        click.echo(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {module}")
+
+    median = statistics.median(timings)
+    click.echo(
+        f"\nTime to {ENTRYPOINT}.agent_engine: median {median:.2f}s over {runs} runs "
+        f"({', '.join(f'{t:.2f}s' for t in timings)}){' offline' if offline else ''}; budget {max_seconds:.2f}s"
+    )
+    if median > max_seconds:
+        click.echo("❌ Import time regression: over budget.", err=True)
+        sys.exit(1)
+    click.echo("✅ Within budget.")
+
+
+if __name__ == "__main__":
+    main()
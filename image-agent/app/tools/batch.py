@@ -0,0 +1,152 @@
+from google.adk.tools import ToolContext
+import asyncio
+import os
+import logging
+from typing import List, Optional, Tuple
+from tools.artifacts import load_image_bytes_from_artifact
+from tools.gemini_image_gen import generate_and_save_gemini_images
+from tools.image_store import SavedImage, save_image_artifact
+from tools.upscale import UpscalePlan, normalize_upscale_factor, plan_upscale, upscale_planned, upscaled_artifact_stem
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_CONCURRENCY = 4
+MAX_BATCH_CONCURRENCY = 16
+
+
+def _batch_concurrency(requested: Optional[int]) -> int:
+    default = int(os.environ.get("IMAGE_BATCH_MAX_CONCURRENCY", DEFAULT_BATCH_CONCURRENCY))
+    limit = requested if requested and requested > 0 else default
+    return max(1, min(limit, MAX_BATCH_CONCURRENCY))
+
+
+async def generate_images_batch(
+    tool_context: ToolContext,
+    prompts: List[str],
+    aspect_ratios: Optional[List[str]] = None,
+    image_size: str = "4k",
+    max_concurrency: Optional[int] = None,
+) -> str:
+    """Generates several images with Gemini 3 Pro in one call, running them concurrently.
+
+    Use this instead of calling `generate_image_gemini` repeatedly when the user asks for
+    several images or variations.
+
+    Args:
+        tool_context: The tool context for saving artifacts.
+        prompts: One text description per image to generate.
+        aspect_ratios: Optional aspect ratio per prompt (same order as `prompts`). A single
+            value applies to every prompt; missing entries default to 1:1.
+        image_size: The image size for every image (default: 4k).
+        max_concurrency: Optional cap on simultaneous generations.
+
+    Returns:
+        A per-item status report listing every saved artifact name.
+    """
+    if not prompts:
+        return "Error: Please provide at least one prompt."
+
+    aspect_ratios = aspect_ratios or []
+    if len(aspect_ratios) == 1:
+        aspect_ratios = aspect_ratios * len(prompts)
+
+    concurrency = _batch_concurrency(max_concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    logger.info(f"Step [generate_images_batch]: {len(prompts)} prompts, concurrency={concurrency}")
+
+    async def run_one(index: int, prompt: str):
+        aspect_ratio = aspect_ratios[index] if index < len(aspect_ratios) and aspect_ratios[index] else "1:1"
+        async with semaphore:
+            saved_images, _ = await generate_and_save_gemini_images(tool_context, prompt, aspect_ratio, image_size)
+        if not saved_images:
+            raise ValueError("No image was generated in the response.")
+        return saved_images
+
+    results = await asyncio.gather(
+        *(run_one(i, prompt) for i, prompt in enumerate(prompts)),
+        return_exceptions=True,
+    )
+
+    lines = []
+    all_filenames = []
+    failures = 0
+    for index, (prompt, result) in enumerate(zip(prompts, results, strict=True)):
+        label = prompt if len(prompt) <= 60 else prompt[:57] + "..."
+        if isinstance(result, BaseException):
+            failures += 1
+            logger.error(f"Step [generate_images_batch]: item {index + 1} failed: {result}")
+            lines.append(f"{index + 1}. FAILED - '{label}': {result}")
+        else:
+            all_filenames.extend(saved.filename for saved in result)
+            lines.append(f"{index + 1}. OK - '{label}': {', '.join(saved.describe() for saved in result)}")
+
+    summary = f"Generated {len(prompts) - failures}/{len(prompts)} images."
+    if all_filenames:
+        summary += f" Artifacts: {', '.join(all_filenames)}"
+    return summary + "\n" + "\n".join(lines)
+
+
+async def upscale_images_batch(
+    tool_context: ToolContext,
+    artifact_names: List[str],
+    scale_factor: float = 4.0,
+    max_concurrency: Optional[int] = None,
+) -> str:
+    """Upscales several artifacts in one call, running the upscales concurrently.
+
+    Use this instead of calling `upscale_image` repeatedly when the user asks to upscale
+    several (or "all of these") images.
+
+    Args:
+        tool_context: The tool context for loading and saving artifacts.
+        artifact_names: The names of the artifacts to upscale.
+        scale_factor: The factor to upscale every image by (2.0 or 4.0, default: 4.0).
+        max_concurrency: Optional cap on simultaneous upscale calls.
+
+    Returns:
+        A per-item status table with the upscaled artifact names.
+    """
+    if not artifact_names:
+        return "Error: Please provide at least one artifact name."
+
+    upscale_factor = normalize_upscale_factor(scale_factor)
+    concurrency = _batch_concurrency(max_concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    logger.info(f"Step [upscale_images_batch]: {len(artifact_names)} artifacts, factor={upscale_factor}, concurrency={concurrency}")
+
+    # 1. Load every source in parallel.
+    sources = await asyncio.gather(
+        *(load_image_bytes_from_artifact(name, tool_context) for name in artifact_names),
+        return_exceptions=True,
+    )
+
+    # 2. Upscale under the concurrency limit, then save each output as soon as it is ready.
+    async def run_one(name: str, image_bytes) -> Tuple[UpscalePlan, SavedImage]:
+        if isinstance(image_bytes, BaseException):
+            raise image_bytes
+        if image_bytes is None:
+            raise FileNotFoundError(f"Artifact '{name}' not found.")
+        # Oversized inputs fail here, before taking a concurrency slot.
+        plan = plan_upscale(image_bytes, scale_factor)
+        async with semaphore:
+            upscaled = await upscale_planned(image_bytes, plan)
+        return plan, await save_image_artifact(tool_context, upscaled_artifact_stem(name), upscaled)
+
+    results = await asyncio.gather(
+        *(run_one(name, image_bytes) for name, image_bytes in zip(artifact_names, sources, strict=True)),
+        return_exceptions=True,
+    )
+
+    lines = ["| # | Source | Status | Output |", "|---|---|---|---|"]
+    failures = 0
+    for index, (name, result) in enumerate(zip(artifact_names, results, strict=True)):
+        if isinstance(result, BaseException):
+            failures += 1
+            logger.error(f"Step [upscale_images_batch]: '{name}' failed: {result}")
+            lines.append(f"| {index + 1} | {name} | FAILED | {result} |")
+        else:
+            plan, saved = result
+            lines.append(f"| {index + 1} | {name} | OK | {plan.describe()}: {saved.describe()} |")
+
+    summary = f"Upscaled {len(artifact_names) - failures}/{len(artifact_names)} images ({upscale_factor})."
+    return summary + "\n" + "\n".join(lines)
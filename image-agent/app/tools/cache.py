@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+from tools import metrics
+from tools.gcs import get_storage_client
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedImage:
+    data: bytes
+    mime_type: str = "image/png"
+
+
+@dataclass
+class CacheEntry:
+    images: List[CachedImage]
+    text: str = ""
+    # How long the original model call took, used to report latency saved.
+    latency_s: float = 0.0
+    size: int = field(init=False)
+
+    def __post_init__(self):
+        self.size = sum(len(image.data) for image in self.images)
+
+
+def make_cache_key(*parts: Any) -> str:
+    """Builds a content-addressed key from the normalized request fields."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.environ.get(name, default).lower() in ("1", "true", "yes")
+
+
+def persistent_cache_bucket() -> Optional[str]:
+    """The bucket for the GCS tier, or None when IMAGE_CACHE_PERSISTENT is off."""
+    bucket = os.environ.get("LOGS_BUCKET_NAME")
+    if not bucket or not _env_flag("IMAGE_CACHE_PERSISTENT", "false"):
+        return None
+    return bucket[5:] if bucket.startswith("gs://") else bucket
+
+
+class ResultCache:
+    """Two-tier result cache: a bounded in-memory LRU and an optional GCS tier.
+
+    The GCS tier lives under `{prefix}/{namespace}/{key}/` in the artifact
+    bucket so results survive restarts and are shared between instances.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int = 256,
+        max_bytes: int = 512 * 1024 * 1024,
+        bucket_name: Optional[str] = None,
+        prefix: str = "image-cache",
+    ):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._lookups = 0
+
+    # ------------------------------------------------------------------
+    # Memory tier
+    # ------------------------------------------------------------------
+    def _memory_get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _memory_put(self, key: str, entry: CacheEntry) -> None:
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                metrics.incr(f"{self.namespace}_cache.evictions")
+            metrics.set_gauge(f"{self.namespace}_cache.memory_bytes", self._bytes)
+            metrics.set_gauge(f"{self.namespace}_cache.memory_entries", len(self._entries))
+
+    # ------------------------------------------------------------------
+    # GCS tier
+    # ------------------------------------------------------------------
+    def _blob_prefix(self, key: str) -> str:
+        return f"{self.prefix}/{self.namespace}/{key}/"
+
+    def _gcs_get(self, key: str) -> Optional[CacheEntry]:
+        bucket = get_storage_client().bucket(self.bucket_name)
+        blobs = sorted(bucket.list_blobs(prefix=self._blob_prefix(key)), key=lambda b: b.name)
+        if not blobs:
+            return None
+        images = [
+            CachedImage(data=blob.download_as_bytes(), mime_type=blob.content_type or "image/png")
+            for blob in blobs
+        ]
+        meta = blobs[0].metadata or {}
+        return CacheEntry(
+            images=images,
+            text=meta.get("text", ""),
+            latency_s=float(meta.get("latency_s", 0.0)),
+        )
+
+    def _gcs_put(self, key: str, entry: CacheEntry) -> None:
+        bucket = get_storage_client().bucket(self.bucket_name)
+        for index, image in enumerate(entry.images):
+            blob = bucket.blob(f"{self._blob_prefix(key)}{index:04d}")
+            if index == 0:
+                blob.metadata = {"text": entry.text[:4096], "latency_s": str(entry.latency_s)}
+            blob.upload_from_string(image.data, content_type=image.mime_type)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        """Looks a key up in memory, then in GCS. Records hit/miss metrics."""
+        entry = self._memory_get(key)
+        tier = "memory"
+        if entry is None and self.bucket_name:
+            try:
+                entry = await asyncio.to_thread(self._gcs_get, key)
+                tier = "gcs"
+            except Exception as e:
+                logger.warning(f"Result cache GCS lookup failed for {key}: {e}")
+                entry = None
+            if entry is not None:
+                self._memory_put(key, entry)
+
+        with self._lock:
+            self._lookups += 1
+            if entry is not None:
+                self._hits += 1
+            hit_ratio = self._hits / self._lookups
+        metrics.set_gauge(f"{self.namespace}_cache.hit_ratio", hit_ratio)
+
+        if entry is None:
+            metrics.incr(f"{self.namespace}_cache.misses")
+            return None
+
+        metrics.incr(f"{self.namespace}_cache.hits", tier=tier)
+        metrics.incr(f"{self.namespace}_cache.bytes_served", entry.size)
+        metrics.incr(f"{self.namespace}_cache.latency_saved_seconds", entry.latency_s)
+        logger.info(f"Result cache hit ({tier}) for {self.namespace} key {key[:12]}")
+        return entry
+
+    async def put(self, key: str, entry: CacheEntry) -> None:
+        """Stores an entry in memory and, if configured, writes it to GCS."""
+        self._memory_put(key, entry)
+        if self.bucket_name:
+            try:
+                await asyncio.to_thread(self._gcs_put, key, entry)
+            except Exception as e:
+                logger.warning(f"Result cache GCS write failed for {key}: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_result_cache(namespace: str) -> Optional[ResultCache]:
+    """Returns the process-wide cache for a namespace, or None if caching is disabled.
+
+    Configuration (environment):
+        IMAGE_CACHE_ENABLED: "true" (default) / "false".
+        IMAGE_CACHE_MAX_ENTRIES: in-memory entry limit (default 256).
+        IMAGE_CACHE_MAX_BYTES: in-memory byte limit (default 512 MiB).
+        IMAGE_CACHE_PERSISTENT: "true" to also persist to LOGS_BUCKET_NAME.
+    """
+    if not _env_flag("IMAGE_CACHE_ENABLED", "true"):
+        return None
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = ResultCache(
+                namespace,
+                max_entries=int(os.environ.get("IMAGE_CACHE_MAX_ENTRIES", "256")),
+                max_bytes=int(os.environ.get("IMAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024))),
+                bucket_name=persistent_cache_bucket(),
+            )
+            _caches[namespace] = cache
+        return cache
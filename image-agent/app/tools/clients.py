@@ -0,0 +1,103 @@
+from google import genai
+from google.genai import types
+import asyncio
+import os
+import threading
+import logging
+from typing import Dict, Optional, Tuple
+
+from tools import metrics
+
+logger = logging.getLogger(__name__)
+
+# Process-wide registry of genai clients. Each client owns its own HTTP
+# connection pool, so handing the same instance to every tool call keeps
+# credentials, keep-alive connections and TLS sessions warm across calls and
+# sessions instead of paying for them on every request.
+#
+# A client's async transport (`client.aio`) is bound to the event loop that
+# first used it, and the sync serving path runs every query in a fresh
+# `asyncio.run`. Clients are therefore also keyed by the running loop (None
+# for sync callers), and entries for closed loops are dropped.
+ClientKey = Tuple[Optional[str], str, Optional[str], Optional[asyncio.AbstractEventLoop]]
+_clients: Dict[ClientKey, genai.Client] = {}
+_clients_lock = threading.Lock()
+_project_lock = threading.Lock()
+
+
+def resolve_project() -> Optional[str]:
+    """The Google Cloud project for model calls, resolved on first use.
+
+    GOOGLE_CLOUD_PROJECT wins when set. Otherwise Application Default
+    Credentials are loaded once (this may call the metadata server) and their
+    project is exported as GOOGLE_CLOUD_PROJECT for every later caller.
+    """
+    project = os.environ.get("GOOGLE_CLOUD_PROJECT")
+    if project:
+        return project
+    with _project_lock:
+        if not os.environ.get("GOOGLE_CLOUD_PROJECT"):
+            import google.auth
+
+            _, project = google.auth.default()
+            if project:
+                os.environ["GOOGLE_CLOUD_PROJECT"] = project
+        return os.environ.get("GOOGLE_CLOUD_PROJECT")
+
+
+def get_genai_client(
+    location: str,
+    project: Optional[str] = None,
+    api_version: Optional[str] = None,
+) -> genai.Client:
+    """Returns the shared Vertex AI genai client for (project, location, api_version).
+
+    Called inside a running event loop, the client is shared only with
+    callers on that same loop, so its `aio` transport is always usable.
+
+    Args:
+        location: The Vertex AI region (or "global").
+        project: The Google Cloud project. Defaults to resolve_project().
+        api_version: Optional API version override (e.g. "v1beta1").
+
+    Returns:
+        A pooled genai.Client.
+    """
+    project = project or resolve_project()
+    try:
+        loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    key = (project, location, api_version, loop)
+
+    client = _clients.get(key)
+    if client is not None:
+        metrics.incr("genai_client.pool_hits")
+        return client
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is not None:
+            metrics.incr("genai_client.pool_hits")
+            return client
+
+        for stale in [k for k in _clients if k[3] is not None and k[3].is_closed()]:
+            del _clients[stale]
+
+        logger.info(f"Creating pooled genai.Client for project={project}, location={location}, api_version={api_version}")
+        http_options = types.HttpOptions(api_version=api_version) if api_version else None
+        client = genai.Client(
+            vertexai=True,
+            project=project,
+            location=location,
+            http_options=http_options,
+        )
+        _clients[key] = client
+        metrics.incr("genai_client.pool_misses")
+        metrics.set_gauge("genai_client.pool_size", len(_clients))
+        return client
+
+
+def get_client_stats() -> Dict[str, float]:
+    """Returns client pool hit/miss counters and the pool size."""
+    return metrics.snapshot("genai_client.")
@@ -1,86 +1,261 @@
-from google import genai
 from google.genai import types
 from google.adk.tools import ToolContext
 import os
+import time
 import uuid
+import asyncio
 import logging
-from typing import Optional, List
+from typing import Callable, Optional, List, Tuple
+from tools import metrics
+from tools.clients import get_genai_client
+from tools.rate_limit import call_with_rate_limit
+from tools.singleflight import SingleFlight
+from tools.cache import CacheEntry, CachedImage, get_result_cache, make_cache_key
+from tools.image_formats import detect_mime_type
+from tools.image_store import SavedImage, save_image_artifact
+from tools.jobs import DetachedArtifactContext, JobResult, submit_image_job
 
 logger = logging.getLogger(__name__)
 
-async def generate_image_gemini(tool_context: ToolContext, prompt: str, aspect_ratio: str = "1:1", image_size: str = "4k") -> str:
-    """Generates an image using Gemini 3 Pro (Thinking Model) and saves it as an artifact.
+GEMINI_IMAGE_MODEL = "gemini-3-pro-image-preview"
 
-    Args:
-        tool_context: The tool context for saving artifacts.
-        prompt: A text description of the image to generated.
-        aspect_ratio: The aspect ratio of the image. Valid values: 1:1, 3:2, 2:3, 3:4, 4:3, 4:5, 5:4, 9:16, 16:9, 21:9.
+_generation_flight = SingleFlight("gemini_generation")
 
-    Returns:
-        A message indicating where the image is saved.
+
+class ImageGenerationError(Exception):
+    """Raised when the model finishes without producing a usable response."""
+
+
+async def _generate_gemini_images(prompt: str, aspect_ratio: str, image_size: str) -> CacheEntry:
+    """Calls Gemini 3 Pro Image and returns the generated images and text."""
+    project_id = os.environ.get("GOOGLE_CLOUD_PROJECT")
+    client = get_genai_client(location="global", project=project_id)
+
+    logger.info(f"Using model: {GEMINI_IMAGE_MODEL}")
+    started = time.monotonic()
+
+    # Using dict for image_config to avoid potential missing class in types module
+    response = await call_with_rate_limit(
+        GEMINI_IMAGE_MODEL,
+        "global",
+        lambda: client.aio.models.generate_content(
+            model=GEMINI_IMAGE_MODEL,
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                response_modalities=['IMAGE', 'TEXT'],
+                image_config={"aspect_ratio": aspect_ratio, "image_size": image_size},
+            ),
+        ),
+    )
+
+    # Check for errors
+    if not response.candidates or response.candidates[0].finish_reason != types.FinishReason.STOP:
+        reason = response.candidates[0].finish_reason if response.candidates else "No candidates"
+        logger.error(f"Prompt Content Error: {reason}")
+        raise ImageGenerationError(reason)
+
+    images: List[CachedImage] = []
+    texts: List[str] = []
+    for part in response.candidates[0].content.parts:
+        if part.inline_data:
+            # Trust the bytes over the label: sniff the real format.
+            images.append(CachedImage(
+                data=part.inline_data.data,
+                mime_type=detect_mime_type(part.inline_data.data, part.inline_data.mime_type),
+            ))
+        if part.text:
+            # Log thought process or partial text
+            logger.info(f"Model thought/text: {part.text[:100]}...")
+            texts.append(part.text)
+
+    latency_s = time.monotonic() - started
+    # Images only exist once the whole response is in, so this is total latency.
+    metrics.observe("gemini.unary_latency_s", latency_s)
+    return CacheEntry(images=images, text="\n".join(texts), latency_s=latency_s)
+
+
+def _streaming_enabled() -> bool:
+    return os.environ.get("IMAGE_GEN_STREAMING", "false").lower() in ("1", "true", "yes")
+
+
+async def _stream_gemini_images(
+    prompt: str,
+    aspect_ratio: str,
+    image_size: str,
+    on_image: Optional[Callable[[CachedImage], None]] = None,
+    on_thought: Optional[Callable[[str], None]] = None,
+) -> CacheEntry:
+    """Streams Gemini 3 Pro Image output, handing over each part as it arrives.
+
+    Final images are passed to `on_image` as soon as their part is received,
+    and thought text to `on_thought` as it is produced. Interim "thought"
+    images are skipped. Returns the same CacheEntry as the unary call.
     """
-    
     project_id = os.environ.get("GOOGLE_CLOUD_PROJECT")
-    location = os.environ.get("GOOGLE_CLOUD_LOCATION", "us-central1") # Standard location
-    model_id = "gemini-3-pro-image-preview"
-    
-    logger.info(f"Starting generate_image_gemini with prompt='{prompt}', aspect_ratio='{aspect_ratio}', image_size='{image_size}'")
+    client = get_genai_client(location="global", project=project_id)
 
-    try:
-        client = genai.Client(
-            vertexai=True,
-            project=project_id,
-            location="global",
-            # http_options={"headers": {"X-Goog-User-Project": None}} # Workaround for ADK location override issue
-        )
-        
-        logger.info(f"Using model: {model_id}")
-        
-        # Using dict for image_config to avoid potential missing class in types module
-        response = client.models.generate_content(
-            model=model_id,
+    logger.info(f"Using model: {GEMINI_IMAGE_MODEL} (streaming)")
+    started = time.monotonic()
+
+    async def open_stream():
+        stream = await client.aio.models.generate_content_stream(
+            model=GEMINI_IMAGE_MODEL,
             contents=prompt,
             config=types.GenerateContentConfig(
                 response_modalities=['IMAGE', 'TEXT'],
                 image_config={"aspect_ratio": aspect_ratio, "image_size": image_size},
+                thinking_config=types.ThinkingConfig(include_thoughts=True),
             ),
         )
-        
-        # Check for errors
-        if not response.candidates or response.candidates[0].finish_reason != types.FinishReason.STOP:
-            reason = response.candidates[0].finish_reason if response.candidates else "No candidates"
-            logger.error(f"Prompt Content Error: {reason}")
-            return f"Error: Image generation failed. Reason: {reason}"
-
-        generated_filenames = []
-        
-        for part in response.candidates[0].content.parts:
-            if part.inline_data:
-                # Save image artifact
-                filename = f"gemini_gen_{uuid.uuid4()}.png"
-                
-                # ADK ToolContext save_artifact expects types.Part
-                # We can reuse the part we received, but ensure mime_type is correct
-                # part.inline_data.data is bytes
-                
-                image_part = types.Part.from_bytes(
+        # The request is only sent when the stream is first iterated; read the
+        # first chunk here so 429s are retried and count against the limiter.
+        return await anext(stream, None), stream
+
+    first_chunk, stream = await call_with_rate_limit(GEMINI_IMAGE_MODEL, "global", open_stream)
+
+    images: List[CachedImage] = []
+    texts: List[str] = []
+    finish_reason = None
+
+    def handle(chunk) -> None:
+        nonlocal finish_reason
+        if not chunk.candidates:
+            return
+        candidate = chunk.candidates[0]
+        finish_reason = candidate.finish_reason or finish_reason
+        if not candidate.content or not candidate.content.parts:
+            return
+        for part in candidate.content.parts:
+            if part.text:
+                if part.thought:
+                    logger.info(f"Model thought: {part.text}")
+                    if on_thought:
+                        on_thought(part.text)
+                else:
+                    texts.append(part.text)
+            if part.inline_data and not part.thought:
+                image = CachedImage(
                     data=part.inline_data.data,
-                    mime_type="image/png"  # Assuming PNG for now
+                    mime_type=detect_mime_type(part.inline_data.data, part.inline_data.mime_type),
                 )
-                
-                await tool_context.save_artifact(filename, image_part)
-                generated_filenames.append(filename)
-                logger.info(f"Saved artifact: {filename}")
-                
-            if part.text:
-                # Log thought process or partial text
-                logger.info(f"Model thought/text: {part.text[:100]}...")
+                if not images:
+                    metrics.observe("gemini.time_to_first_image_s", time.monotonic() - started)
+                images.append(image)
+                if on_image:
+                    on_image(image)
+
+    if first_chunk is not None:
+        handle(first_chunk)
+        async for chunk in stream:
+            handle(chunk)
 
-        if not generated_filenames:
-             return "No image was generated in the response."
+    if not images and finish_reason != types.FinishReason.STOP:
+        reason = finish_reason or "No candidates"
+        logger.error(f"Prompt Content Error: {reason}")
+        raise ImageGenerationError(reason)
 
-        return f"Image(s) generated successfully: {', '.join(generated_filenames)} Model thought/text: {part.text}"
+    return CacheEntry(images=images, text="".join(texts), latency_s=time.monotonic() - started)
+
+
+async def generate_and_save_gemini_images(tool_context: ToolContext, prompt: str, aspect_ratio: str = "1:1", image_size: str = "4k") -> Tuple[List[SavedImage], str]:
+    """Generates (or serves from cache) Gemini images and saves them as artifacts.
+
+    With IMAGE_GEN_STREAMING enabled, the model output is streamed and each
+    image is saved as soon as it arrives instead of after the whole response.
+    When running as a background job, thoughts and save counts are reported
+    as the job's progress in check_image_job. An inline tool call has no
+    channel for partial output, so there they are only logged.
+
+    Returns:
+        The saved images and the model's text. Raises on failure.
+    """
+    cache = get_result_cache("generation")
+    cache_key = make_cache_key(GEMINI_IMAGE_MODEL, prompt, aspect_ratio, image_size.lower())
+    # Saves started while streaming, in arrival order.
+    streamed_saves: List["asyncio.Future[SavedImage]"] = []
+    report_progress = tool_context.report_progress if isinstance(tool_context, DetachedArtifactContext) else None
+
+    def save_now(image: CachedImage) -> None:
+        streamed_saves.append(asyncio.ensure_future(_save_generated_image(tool_context, image)))
+        if report_progress:
+            report_progress(f"{len(streamed_saves)} image(s) received, saving.")
+
+    def on_thought(text: str) -> None:
+        if report_progress:
+            report_progress(text)
+
+    async def produce() -> CacheEntry:
+        result = await cache.get(cache_key) if cache else None
+        if result is None:
+            if _streaming_enabled():
+                result = await _stream_gemini_images(prompt, aspect_ratio, image_size, on_image=save_now, on_thought=on_thought)
+            else:
+                result = await _generate_gemini_images(prompt, aspect_ratio, image_size)
+            if cache and result.images:
+                await cache.put(cache_key, result)
+        return result
+
+    # Identical requests already in flight share one model call; each caller
+    # still saves the result under its own artifact names below.
+    try:
+        result = await _generation_flight.do(cache_key, produce)
+    except BaseException:
+        # Keep partial results: saves already started run to completion.
+        await asyncio.gather(*streamed_saves, return_exceptions=True)
+        raise
+
+    if streamed_saves:
+        # This caller led a streamed call; its images were saved as they arrived.
+        return list(await asyncio.gather(*streamed_saves)), result.text
+
+    saved_images = []
+    for image in result.images:
+        saved_images.append(await _save_generated_image(tool_context, image))
+
+    return saved_images, result.text
+
+
+async def _save_generated_image(tool_context: ToolContext, image: CachedImage) -> SavedImage:
+    # Save image artifact; the extension follows the sniffed format.
+    saved = await save_image_artifact(tool_context, f"gemini_gen_{uuid.uuid4()}", image.data, image.mime_type)
+    logger.info(f"Saved artifact: {saved.filename}")
+    return saved
+
+
+def _generation_message(saved_images: List[SavedImage], text: str) -> str:
+    if not saved_images:
+        return "No image was generated in the response."
+    return f"Image(s) generated successfully: {', '.join(saved.describe() for saved in saved_images)} Model thought/text: {text}"
+
+
+async def generate_image_gemini(tool_context: ToolContext, prompt: str, aspect_ratio: str = "1:1", image_size: str = "4k", background: bool = False) -> str:
+    """Generates an image using Gemini 3 Pro (Thinking Model) and saves it as an artifact.
+
+    Args:
+        tool_context: The tool context for saving artifacts.
+        prompt: A text description of the image to generated.
+        aspect_ratio: The aspect ratio of the image. Valid values: 1:1, 3:2, 2:3, 3:4, 4:3, 4:5, 5:4, 9:16, 16:9, 21:9.
+        background: If True, start a background job and return its job ID immediately
+            instead of waiting; use `check_image_job` to get the result.
+
+    Returns:
+        A message indicating where the image is saved, or the background job ID.
+    """
+    logger.info(f"Starting generate_image_gemini with prompt='{prompt}', aspect_ratio='{aspect_ratio}', image_size='{image_size}', background={background}")
+
+    if background:
+        async def run(context) -> JobResult:
+            saved_images, text = await generate_and_save_gemini_images(context, prompt, aspect_ratio, image_size)
+            return _generation_message(saved_images, text), [saved.filename for saved in saved_images]
+
+        return submit_image_job(tool_context, "generate", f"{image_size} {aspect_ratio} image", run)
+
+    try:
+        saved_images, text = await generate_and_save_gemini_images(tool_context, prompt, aspect_ratio, image_size)
+        return _generation_message(saved_images, text)
 
+    except ImageGenerationError as e:
+        return f"Error: Image generation failed. Reason: {e}"
     except Exception as e:
         logger.error(f"Error generating image with Gemini: {str(e)}", exc_info=True)
         return f"Error generating image: {str(e)}"
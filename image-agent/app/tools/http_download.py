@@ -0,0 +1,125 @@
+import io
+import asyncio
+import os
+import threading
+import logging
+import mimetypes
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+from tools import metrics
+from tools.image_formats import sniff_mime_type
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+DEFAULT_TIMEOUT_S = 60.0
+CHUNK_SIZE = 256 * 1024
+
+
+class DownloadTooLargeError(Exception):
+    """Raised when a download exceeds the configured maximum size."""
+
+
+@dataclass
+class DownloadResult:
+    data: bytes
+    mime_type: str
+    size: int
+
+
+_http_client: Optional["httpx.AsyncClient"] = None
+_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> "httpx.AsyncClient":
+    """Returns the shared, connection-pooled HTTP client used for URL downloads.
+
+    The client's connections belong to the event loop that opened them, so a
+    new client is built whenever the running loop changes (the sync
+    stream_query path runs each query in a fresh loop).
+    """
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        with _http_client_lock:
+            if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+                import httpx
+
+                _http_client = httpx.AsyncClient(
+                    follow_redirects=True,
+                    limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+                )
+                _http_client_loop = loop
+    return _http_client
+
+
+def _resolve_mime_type(header: Optional[str], head: bytes, filename: str) -> str:
+    # Prefer what the bytes say, then the server, then the filename.
+    sniffed = sniff_mime_type(head)
+    if sniffed:
+        return sniffed
+    if header:
+        header_type = header.split(";", 1)[0].strip().lower()
+        if header_type and header_type != "application/octet-stream":
+            return header_type
+    guessed, _ = mimetypes.guess_type(filename)
+    return guessed or "application/octet-stream"
+
+
+async def download_to_bytes(
+    url: str,
+    filename: str = "",
+    max_bytes: Optional[int] = None,
+    timeout_s: Optional[float] = None,
+) -> DownloadResult:
+    """Streams a URL into memory in chunks.
+
+    Args:
+        url: The URL to download.
+        filename: Used as a last-resort hint for the content type.
+        max_bytes: Abort once the body exceeds this many bytes
+            (default: DOWNLOAD_MAX_BYTES env or 100 MiB).
+        timeout_s: Timeout for the whole transfer
+            (default: DOWNLOAD_TIMEOUT_S env or 60s).
+
+    Returns:
+        The downloaded bytes and their detected MIME type.
+    """
+    if max_bytes is None:
+        max_bytes = int(os.environ.get("DOWNLOAD_MAX_BYTES", DEFAULT_MAX_BYTES))
+    if timeout_s is None:
+        timeout_s = float(os.environ.get("DOWNLOAD_TIMEOUT_S", DEFAULT_TIMEOUT_S))
+
+    return await asyncio.wait_for(_stream_to_bytes(url, filename, max_bytes, timeout_s), timeout_s)
+
+
+async def _stream_to_bytes(url: str, filename: str, max_bytes: int, timeout_s: float) -> DownloadResult:
+    client = get_http_client()
+    async with client.stream("GET", url, timeout=timeout_s) as response:
+        response.raise_for_status()
+
+        declared = response.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            raise DownloadTooLargeError(f"{url} is {declared} bytes, limit is {max_bytes}")
+
+        # BytesIO.getvalue() hands back its buffer without copying, so the body
+        # is held once rather than as chunks plus a joined copy.
+        buffer = io.BytesIO()
+        size = 0
+        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                raise DownloadTooLargeError(f"{url} exceeded the {max_bytes} byte limit")
+            buffer.write(chunk)
+
+        data = buffer.getvalue()
+        mime_type = _resolve_mime_type(response.headers.get("content-type"), data[:16], filename)
+
+    metrics.incr("url_download.bytes", size)
+    metrics.incr("url_download.count")
+    return DownloadResult(data=data, mime_type=mime_type, size=size)
@@ -0,0 +1,162 @@
+import logging
+import struct
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def sniff_mime_type(data: bytes) -> Optional[str]:
+    """Detects common image formats from their leading magic bytes.
+
+    Args:
+        data: The file contents, or at least the first 16 bytes.
+
+    Returns:
+        The MIME type, or None if the format is not recognized.
+    """
+    head = bytes(data[:16])
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if head[4:12] in (b"ftypavif", b"ftypavis"):
+        return "image/avif"
+    if head[4:12] in (b"ftypheic", b"ftypheix", b"ftypmif1"):
+        return "image/heic"
+    if head.startswith((b"II*\x00", b"MM\x00*")):
+        return "image/tiff"
+    if head.startswith(b"BM"):
+        return "image/bmp"
+    return None
+
+
+
+def probe_dimensions(data: bytes) -> Optional[Tuple[int, int]]:
+    """Reads (width, height) from a PNG, JPEG or WebP header without decoding pixels.
+
+    Returns:
+        The dimensions, or None for other formats or truncated/corrupt headers.
+    """
+    try:
+        mime_type = sniff_mime_type(data)
+        if mime_type == "image/png":
+            return struct.unpack(">II", data[16:24])
+        if mime_type == "image/jpeg":
+            return _probe_jpeg(data)
+        if mime_type == "image/webp":
+            return _probe_webp(data)
+    except (struct.error, IndexError):
+        logger.warning("Truncated image header, dimensions unknown")
+    return None
+
+
+def _probe_jpeg(data: bytes) -> Optional[Tuple[int, int]]:
+    # Walk the marker segments up to the first start-of-frame.
+    offset = 2
+    while offset < len(data):
+        while data[offset] == 0xFF:  # fill bytes
+            offset += 1
+        marker = data[offset]
+        offset += 1
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            continue  # standalone markers carry no length
+        if marker == 0xD9:
+            return None
+        (length,) = struct.unpack(">H", data[offset:offset + 2])
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", data[offset + 3:offset + 7])
+            return width, height
+        offset += length + 1  # skip the segment and land on the next 0xFF
+    return None
+
+
+def _probe_webp(data: bytes) -> Optional[Tuple[int, int]]:
+    if len(data) < 30:
+        return None
+    chunk = data[12:16]
+    if chunk == b"VP8 ":  # lossy: 14-bit dimensions after the frame start code
+        width, height = struct.unpack("<HH", data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":  # lossless: 14-bit width-1/height-1 packed after the signature byte
+        (bits,) = struct.unpack("<I", data[21:25])
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":  # extended: 24-bit canvas width-1/height-1
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        return width, height
+    return None
+
+_EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+    "image/avif": ".avif",
+    "image/heic": ".heic",
+    "image/tiff": ".tiff",
+    "image/bmp": ".bmp",
+}
+
+# Pillow format names and MIME types for the supported delivery encodings.
+_ENCODINGS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "jpg": ("JPEG", "image/jpeg"),
+}
+
+
+def extension_for(mime_type: str) -> str:
+    """File extension (with dot) for an image MIME type; ".bin" if unknown."""
+    return _EXTENSIONS.get(mime_type, ".bin")
+
+
+def detect_mime_type(data: bytes, reported: Optional[str] = None) -> str:
+    """The sniffed MIME type, else the reported one, else image/png."""
+    return sniff_mime_type(data) or reported or "image/png"
+
+
+def encoding_mime_type(fmt: str) -> str:
+    return _ENCODINGS[fmt.lower()][1]
+
+
+def reencode_image(data: bytes, fmt: str, quality: int) -> bytes:
+    """Re-encodes image bytes to WebP or JPEG. CPU bound; run it off the event loop."""
+    import io
+
+    from PIL import Image
+
+    pil_format, _ = _ENCODINGS[fmt.lower()]
+    with Image.open(io.BytesIO(data)) as image:
+        if pil_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        out = io.BytesIO()
+        save_args = {"quality": quality}
+        if pil_format == "WEBP":
+            save_args["method"] = 4
+        else:
+            save_args["optimize"] = True
+        image.save(out, format=pil_format, **save_args)
+        return out.getvalue()
+
+
+def make_thumbnail(data: bytes, max_size: int, fmt: str = "webp", quality: int = 80) -> bytes:
+    """Downscales an image so its longest side is at most `max_size` pixels. CPU bound."""
+    import io
+
+    from PIL import Image
+
+    pil_format, _ = _ENCODINGS[fmt.lower()]
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft("RGB", (max_size, max_size))  # cheap JPEG DCT downscale
+        image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        if image.mode not in ("RGB", "RGBA", "L"):
+            image = image.convert("RGBA" if pil_format == "WEBP" else "RGB")
+        if pil_format == "JPEG" and image.mode == "RGBA":
+            image = image.convert("RGB")
+        out = io.BytesIO()
+        image.save(out, format=pil_format, quality=quality)
+        return out.getvalue()
@@ -1,71 +1,114 @@
-from google import genai
 from google.genai import types
+import asyncio
 import os
+import time
 import uuid
 import logging
 from google.adk.tools import ToolContext
+from tools.clients import get_genai_client
+from tools.rate_limit import call_with_rate_limit
+from tools.regions import get_region_pool
+from tools.singleflight import SingleFlight
+from tools.cache import CacheEntry, CachedImage, get_result_cache, make_cache_key
+from tools.image_formats import detect_mime_type
+from tools.image_store import save_image_artifact
 
 logger = logging.getLogger(__name__)
 
-async def generate_image(tool_context: ToolContext, prompt: str, aspect_ratio: str = "1:1") -> str:
-    """Generates an image based on the prompt using Imagen 4 and saves it as an artifact.
+MAX_CANDIDATES = 4
+
+_generation_flight = SingleFlight("imagen_generation")
+
+
+async def _generate_imagen_images(model_name: str, prompt: str, aspect_ratio: str, number_of_images: int) -> CacheEntry:
+    """Calls Imagen in the healthiest region and returns the generated images."""
+    project_id = os.environ.get("GOOGLE_CLOUD_PROJECT")
+    started = time.monotonic()
+
+    async def call_region(region: str):
+        client = get_genai_client(location=region, project=project_id)
+        # Imagen 4 supports 1K and 2K image_size
+        return await call_with_rate_limit(
+            model_name,
+            region,
+            lambda: client.aio.models.generate_images(
+                model=model_name,
+                prompt=prompt,
+                config=types.GenerateImagesConfig(
+                    aspect_ratio=aspect_ratio,
+                    number_of_images=number_of_images,
+                    # image_size="2K"
+                )
+            ),
+        )
+
+    # Healthiest configured region first, failing over on errors/timeouts.
+    pool = get_region_pool(model_name, "IMAGE_GEN_MODEL_REGIONS", "IMAGE_GEN_MODEL_REGION")
+    response = await pool.call(call_region)
+
+    return CacheEntry(
+        images=[
+            CachedImage(
+                data=generated.image.image_bytes,
+                mime_type=detect_mime_type(generated.image.image_bytes, generated.image.mime_type),
+            )
+            for generated in response.generated_images or []
+            if generated.image and generated.image.image_bytes
+        ],
+        latency_s=time.monotonic() - started,
+    )
+
+
+async def generate_image(tool_context: ToolContext, prompt: str, aspect_ratio: str = "1:1", number_of_images: int = 1) -> str:
+    """Generates one or more images based on the prompt using Imagen 4 and saves them as artifacts.
 
     Args:
         tool_context: The tool context for saving artifacts.
         prompt: The text description of the image to generate.
         aspect_ratio: The aspect ratio of the image (e.g., "1:1", "16:9", "3:4", "4:3").
+        number_of_images: How many candidate images to generate in the same request (1-4).
 
     Returns:
-        A message indicating where the image is saved.
+        A message indicating where the image(s) are saved.
     """
-    project_id = os.environ.get("GOOGLE_CLOUD_PROJECT")
-    location = os.environ.get("IMAGE_GEN_MODEL_REGION", "us-central1")
-    
     # Use environment variable for model name
     model_name = os.environ.get("IMAGE_GEN_MODEL", "imagen-4.0-generate-001")
     
-    logger.info(f"Starting image generation with model={model_name}, prompt='{prompt}', aspect_ratio={aspect_ratio}")
+    number_of_images = max(1, min(int(number_of_images or 1), MAX_CANDIDATES))
+    logger.info(f"Starting image generation with model={model_name}, prompt='{prompt}', aspect_ratio={aspect_ratio}, number_of_images={number_of_images}")
     
     try:
-        client = genai.Client(
-            vertexai=True,
-            project=project_id,
-            location=location,
-        )
-        
-        # Imagen 4 supports 1K and 2K image_size
-        response = client.models.generate_images(
-            model=model_name,
-            prompt=prompt,
-            config=types.GenerateImagesConfig(
-                aspect_ratio=aspect_ratio,
-                number_of_images=1,
-                # image_size="2K"
-            )
-        )
-        
-        if not response.generated_images:
+        cache = get_result_cache("generation")
+        # Imagen has no image_size knob here, so it is keyed as None.
+        cache_key = make_cache_key(model_name, prompt, aspect_ratio, None, number_of_images)
+
+        async def produce() -> CacheEntry:
+            result = await cache.get(cache_key) if cache else None
+            if result is None:
+                result = await _generate_imagen_images(model_name, prompt, aspect_ratio, number_of_images)
+                if cache and result.images:
+                    await cache.put(cache_key, result)
+            return result
+
+        # Identical requests already in flight share one model call.
+        result = await _generation_flight.do(cache_key, produce)
+
+        if not result.images:
             return "Failed to generate image."
-            
-        image = response.generated_images[0].image
-        
-        filename = f"gen_{uuid.uuid4()}.png"
-        local_path = f"/tmp/{filename}"
-        
-        # Save locally first
-        image.save(local_path)
-        
-        # Read back bytes for artifact saving
-        with open(local_path, "rb") as f:
-            image_bytes = f.read()
 
-        report_artifact = types.Part.from_bytes(
-            data=image_bytes, mime_type="image/png"
-        )
-        await tool_context.save_artifact(filename, report_artifact)
-        
-        logger.info(f"Image generated successfully and saved as artifact: {filename}")
-        return f"Image generated successfully and saved as artifact: {filename}"
+        # Every candidate becomes its own artifact; saves run concurrently.
+        saved_images = await asyncio.gather(*(
+            save_image_artifact(tool_context, f"gen_{uuid.uuid4()}", image.data, image.mime_type)
+            for image in result.images
+        ))
+        details = ", ".join(saved.describe() for saved in saved_images)
+
+        if len(saved_images) == 1:
+            logger.info(f"Image generated successfully and saved as artifact: {details}")
+            return f"Image generated successfully and saved as artifact: {details}"
+
+        logger.info(f"{len(saved_images)} images generated successfully and saved as artifacts: {details}")
+        return f"{len(saved_images)} images generated successfully and saved as artifacts: {details}"
         
     except Exception as e:
         logger.error(f"Error generating image with {model_name}: {str(e)}", exc_info=True)
@@ -0,0 +1,140 @@
+from google.adk.tools import ToolContext
+from google.genai import types
+import asyncio
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from tools import metrics
+from tools.image_formats import detect_mime_type, encoding_mime_type, extension_for, make_thumbnail, reencode_image
+
+logger = logging.getLogger(__name__)
+
+# Image encoding is CPU bound; Pillow releases the GIL while it works, so a
+# small thread pool keeps it off the event loop without pickling image bytes.
+_encode_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("IMAGE_ENCODE_WORKERS", "2")),
+    thread_name_prefix="image-encode",
+)
+
+
+@dataclass
+class SavedImage:
+    filename: str
+    mime_type: str
+    size: int
+    delivery_filename: Optional[str] = None
+    delivery_size: int = 0
+    preview_filename: Optional[str] = None
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.size - self.delivery_size if self.delivery_filename else 0
+
+    def describe(self) -> str:
+        """Short human-readable summary for tool responses."""
+        text = f"`{self.filename}` ({self.mime_type}, {self.size / 1024:.0f} KB)"
+        if self.delivery_filename:
+            text += f", compact copy `{self.delivery_filename}` ({self.delivery_size / 1024:.0f} KB, saved {self.bytes_saved / 1024:.0f} KB)"
+        if self.preview_filename:
+            text += f", preview `{self.preview_filename}`"
+        return text
+
+
+def delivery_policy() -> Optional[Tuple[str, int]]:
+    """The configured delivery encoding, e.g. ("webp", 85), or None to keep only originals.
+
+    IMAGE_DELIVERY_FORMAT: "webp" or "jpeg" (unset: disabled).
+    IMAGE_DELIVERY_QUALITY: encoder quality 1-100 (default 85).
+    """
+    fmt = os.environ.get("IMAGE_DELIVERY_FORMAT", "").strip().lower()
+    if fmt in ("", "none", "original"):
+        return None
+    if fmt not in ("webp", "jpeg", "jpg"):
+        logger.warning(f"Unsupported IMAGE_DELIVERY_FORMAT '{fmt}', keeping originals only")
+        return None
+    return fmt, int(os.environ.get("IMAGE_DELIVERY_QUALITY", "85"))
+
+
+def preview_artifact_name(stem: str) -> str:
+    """Predictable thumbnail artifact name for the image saved under `stem`."""
+    return f"{stem}_preview.webp"
+
+
+def _previews_enabled() -> bool:
+    return os.environ.get("IMAGE_PREVIEW_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+async def run_in_encode_pool(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_encode_pool, func, *args)
+
+
+async def save_image_artifact(
+    tool_context: ToolContext,
+    stem: str,
+    data: bytes,
+    reported_mime_type: Optional[str] = None,
+) -> SavedImage:
+    """Saves image bytes as `{stem}{ext}` using the format sniffed from the bytes.
+
+    After the original is saved, two optional stages run concurrently in the
+    encode pool: a re-encoded delivery copy `{stem}{delivery ext}` when a
+    delivery policy is configured, and a small `{stem}_preview.webp`
+    thumbnail (IMAGE_PREVIEW_ENABLED, IMAGE_PREVIEW_MAX_SIZE).
+    """
+    mime_type = detect_mime_type(data, reported_mime_type)
+    filename = f"{stem}{extension_for(mime_type)}"
+    await tool_context.save_artifact(filename, types.Part.from_bytes(data=data, mime_type=mime_type))
+    saved = SavedImage(filename=filename, mime_type=mime_type, size=len(data))
+
+    await asyncio.gather(
+        _save_delivery_copy(tool_context, stem, data, saved),
+        _save_preview(tool_context, stem, data, saved),
+    )
+
+    metrics.incr("image_store.saved_bytes", saved.size)
+    return saved
+
+
+async def _save_delivery_copy(tool_context: ToolContext, stem: str, data: bytes, saved: SavedImage) -> None:
+    policy = delivery_policy()
+    if not policy:
+        return
+    fmt, quality = policy
+    delivery_mime = encoding_mime_type(fmt)
+    if delivery_mime == saved.mime_type:
+        return
+    try:
+        encoded = await run_in_encode_pool(reencode_image, data, fmt, quality)
+    except Exception as e:
+        logger.warning(f"Could not re-encode '{saved.filename}' to {fmt}: {e}")
+        return
+    if len(encoded) >= len(data):
+        return
+    delivery_filename = f"{stem}{extension_for(delivery_mime)}"
+    await tool_context.save_artifact(
+        delivery_filename, types.Part.from_bytes(data=encoded, mime_type=delivery_mime)
+    )
+    saved.delivery_filename = delivery_filename
+    saved.delivery_size = len(encoded)
+    metrics.incr("image_store.delivery_bytes_saved", saved.bytes_saved)
+
+
+async def _save_preview(tool_context: ToolContext, stem: str, data: bytes, saved: SavedImage) -> None:
+    if not _previews_enabled():
+        return
+    max_size = int(os.environ.get("IMAGE_PREVIEW_MAX_SIZE", "512"))
+    try:
+        thumbnail = await run_in_encode_pool(make_thumbnail, data, max_size)
+    except Exception as e:
+        logger.warning(f"Could not create a preview for '{saved.filename}': {e}")
+        return
+    preview_filename = preview_artifact_name(stem)
+    await tool_context.save_artifact(
+        preview_filename, types.Part.from_bytes(data=thumbnail, mime_type="image/webp")
+    )
+    saved.preview_filename = preview_filename
+    metrics.incr("image_store.previews")
+    metrics.incr("image_store.preview_bytes", len(thumbnail))
@@ -0,0 +1,354 @@
+from google.adk.tools import ToolContext
+from google.genai import types
+import asyncio
+import concurrent.futures
+import json
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from tools import metrics
+
+logger = logging.getLogger(__name__)
+
+# A job returns its user-facing message and the artifact names it saved.
+JobResult = Tuple[str, List[str]]
+SessionKey = Tuple[str, str, str]
+
+_JOB_ARTIFACT_PREFIX = "image_job_"
+
+
+class JobRejectedError(Exception):
+    """The job queue is full or the session already has too many active jobs."""
+
+
+def job_artifact_name(job_id: str) -> str:
+    """The session artifact that holds a job's persisted status."""
+    return f"{_JOB_ARTIFACT_PREFIX}{job_id}.json"
+
+
+def _persistence_enabled() -> bool:
+    return os.environ.get("IMAGE_JOB_PERSIST", "true").lower() in ("1", "true", "yes")
+
+
+class DetachedArtifactContext:
+    """Saves artifacts into a tool call's session after the call has returned.
+
+    Keeps the artifact service and session identifiers rather than the live
+    ToolContext, so a background job can outlive the agent turn that queued
+    it. Provides the part of the ToolContext API that save_image_artifact uses.
+    """
+
+    def __init__(self, tool_context: ToolContext):
+        invocation_context = tool_context._invocation_context
+        self.artifact_service = invocation_context.artifact_service
+        self.app_name = invocation_context.app_name
+        self.user_id = invocation_context.user_id
+        self.session_id = invocation_context.session.id
+        self.job: Optional["ImageJob"] = None
+
+    @property
+    def session_key(self) -> SessionKey:
+        return self.app_name, self.user_id, self.session_id
+
+    def report_progress(self, text: str) -> None:
+        """Shows `text` as the running job's latest progress in check_image_job."""
+        if self.job is not None:
+            self.job.progress = text
+
+    async def save_artifact(self, filename: str, artifact: types.Part) -> int:
+        if self.artifact_service is None:
+            raise ValueError("Artifact service is not initialized.")
+        return await self.artifact_service.save_artifact(
+            app_name=self.app_name,
+            user_id=self.user_id,
+            session_id=self.session_id,
+            filename=filename,
+            artifact=artifact,
+        )
+
+
+@dataclass
+class ImageJob:
+    job_id: str
+    kind: str
+    description: str
+    session_key: SessionKey
+    status: str = "queued"  # queued -> running -> done | failed
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    message: str = ""
+    progress: str = ""
+    artifacts: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def to_json(self) -> bytes:
+        return json.dumps(asdict(self)).encode("utf-8")
+
+    @classmethod
+    def from_json(cls, data: bytes) -> "ImageJob":
+        fields = json.loads(data)
+        fields["session_key"] = tuple(fields["session_key"])
+        return cls(**fields)
+
+    def describe(self) -> str:
+        """Short human-readable status for tool responses."""
+        text = f"Job `{self.job_id}` ({self.kind}: {self.description})"
+        if self.status == "failed":
+            return text + f" failed. Error: {self.error}"
+        text += f" is {self.status}"
+        if self.status == "queued":
+            return text + f", waiting for {time.time() - self.created_at:.0f}s."
+        if self.status == "running":
+            text += f", running for {time.time() - self.started_at:.0f}s."
+            return text + f" Latest progress: {self.progress}" if self.progress else text
+        text += f" after {self.finished_at - self.created_at:.0f}s. {self.message}"
+        if self.artifacts:
+            text += f" Artifacts: {', '.join(self.artifacts)}"
+        return text
+
+
+class JobManager:
+    """Runs image jobs in the background with bounded capacity.
+
+    At most `max_pending` jobs may be queued or running at once, and at most
+    `max_per_session` of those may belong to one session; further submissions
+    are rejected rather than queued without bound. `max_running` jobs run
+    concurrently, the rest wait in submission order. Finished jobs are kept
+    for status checks up to `max_finished` entries.
+
+    Jobs run on an event loop in a dedicated thread, started on first use,
+    so they outlive the loop of the request that queued them: the sync
+    stream_query path closes its loop as soon as the query returns.
+
+    Jobs run in the process that accepted them. With `persist` set, each
+    status change is also saved as a JSON artifact in the job's session, so
+    check_image_job can answer on any replica that shares the artifact
+    service. Limits and progress text are per process.
+    """
+
+    def __init__(
+        self,
+        max_pending: int = 64,
+        max_per_session: int = 3,
+        max_running: int = 4,
+        max_finished: int = 1000,
+        persist: bool = True,
+    ):
+        self.max_pending = max_pending
+        self.max_per_session = max_per_session
+        self.max_running = max_running
+        self.max_finished = max_finished
+        self.persist = persist
+        self._jobs: "OrderedDict[str, ImageJob]" = OrderedDict()
+        self._tasks: Dict[str, concurrent.futures.Future] = {}
+        # Only used on the job loop.
+        self._slots = asyncio.Semaphore(max_running)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def _job_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="image-jobs", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def _active_jobs(self) -> List[ImageJob]:
+        return [job for job in self._jobs.values() if job.active]
+
+    def submit(
+        self,
+        context: DetachedArtifactContext,
+        kind: str,
+        description: str,
+        run: Callable[[DetachedArtifactContext], Awaitable[JobResult]],
+    ) -> ImageJob:
+        """Queues `run(context)` on the job loop and returns its job immediately.
+
+        Raises:
+            JobRejectedError: If the queue or the session's allowance is full.
+        """
+        with self._lock:
+            active = self._active_jobs()
+            if len(active) >= self.max_pending:
+                metrics.incr("jobs.rejected", reason="queue_full")
+                raise JobRejectedError(f"The job queue is full ({self.max_pending} jobs); try again shortly.")
+            if sum(1 for job in active if job.session_key == context.session_key) >= self.max_per_session:
+                metrics.incr("jobs.rejected", reason="session_limit")
+                raise JobRejectedError(
+                    f"This session already has {self.max_per_session} jobs in progress; wait for one to finish."
+                )
+            job = ImageJob(job_id=uuid.uuid4().hex[:12], kind=kind, description=description, session_key=context.session_key)
+            self._jobs[job.job_id] = job
+            self._evict_finished()
+
+        future = asyncio.run_coroutine_threadsafe(self._run(job, context, run), self._job_loop())
+        self._tasks[job.job_id] = future
+        future.add_done_callback(lambda _: self._tasks.pop(job.job_id, None))
+        metrics.incr("jobs.submitted", kind=kind)
+        with self._lock:
+            metrics.set_gauge("jobs.active", len(self._active_jobs()))
+        logger.info(f"Queued {kind} job {job.job_id}: {description}")
+        return job
+
+    async def _persist(self, job: ImageJob, context: DetachedArtifactContext) -> None:
+        if not self.persist:
+            return
+        try:
+            await context.save_artifact(
+                job_artifact_name(job.job_id),
+                types.Part.from_bytes(data=job.to_json(), mime_type="application/json"),
+            )
+        except Exception as e:
+            # Only other replicas' status checks depend on this; never fail the job.
+            logger.warning(f"Could not persist status of job {job.job_id}: {e}")
+            metrics.incr("jobs.persist_errors")
+
+    async def _run(self, job: ImageJob, context: DetachedArtifactContext, run) -> None:
+        context.job = job
+        await self._persist(job, context)
+        async with self._slots:
+            job.status = "running"
+            job.started_at = time.time()
+            metrics.observe("jobs.queue_wait_s", job.started_at - job.created_at, kind=job.kind)
+            await self._persist(job, context)
+            try:
+                job.message, job.artifacts = await run(context)
+                job.status = "done"
+            except Exception as e:
+                logger.error(f"{job.kind} job {job.job_id} failed: {e}", exc_info=True)
+                job.error = str(e)
+                job.status = "failed"
+            except asyncio.CancelledError:
+                job.error = "The job was cancelled because the server shut down."
+                job.status = "failed"
+                raise
+            finally:
+                job.finished_at = time.time()
+                metrics.incr(f"jobs.{job.status}", kind=job.kind)
+                metrics.observe("jobs.run_s", job.finished_at - job.started_at, kind=job.kind)
+                with self._lock:
+                    metrics.set_gauge("jobs.active", len(self._active_jobs()))
+                await self._persist(job, context)
+
+    def _evict_finished(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[: max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str, session_key: SessionKey) -> Optional[ImageJob]:
+        """The job, if it exists and was submitted from the same session."""
+        job = self._jobs.get(job_id)
+        if job is None or job.session_key != session_key:
+            return None
+        return job
+
+    def session_jobs(self, session_key: SessionKey) -> List[ImageJob]:
+        return [job for job in self._jobs.values() if job.session_key == session_key]
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """The process-wide job manager.
+
+    IMAGE_JOB_MAX_PENDING: queued + running jobs across all sessions (default 64).
+    IMAGE_JOB_MAX_PER_SESSION: queued + running jobs per session (default 3).
+    IMAGE_JOB_MAX_RUNNING: jobs running at once (default 4).
+    IMAGE_JOB_PERSIST: save job status as session artifacts (default true).
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager(
+                max_pending=int(os.environ.get("IMAGE_JOB_MAX_PENDING", "64")),
+                max_per_session=int(os.environ.get("IMAGE_JOB_MAX_PER_SESSION", "3")),
+                max_running=int(os.environ.get("IMAGE_JOB_MAX_RUNNING", "4")),
+                persist=_persistence_enabled(),
+            )
+        return _manager
+
+
+def submit_image_job(
+    tool_context: ToolContext,
+    kind: str,
+    description: str,
+    run: Callable[[DetachedArtifactContext], Awaitable[JobResult]],
+) -> str:
+    """Queues a job for a tool and returns the tool response naming its job ID."""
+    try:
+        job = get_job_manager().submit(DetachedArtifactContext(tool_context), kind, description, run)
+    except JobRejectedError as e:
+        return f"Error: {e}"
+    return (
+        f"Started background job `{job.job_id}` ({kind}). "
+        f"Use `check_image_job` with this job ID to get the result."
+    )
+
+
+async def _load_persisted_job(tool_context: ToolContext, job_id: str) -> Optional[ImageJob]:
+    try:
+        part = await tool_context.load_artifact(job_artifact_name(job_id))
+    except Exception as e:
+        logger.warning(f"Could not load persisted status of job {job_id}: {e}")
+        return None
+    if part is None or not part.inline_data:
+        return None
+    return ImageJob.from_json(part.inline_data.data)
+
+
+async def check_image_job(tool_context: ToolContext, job_id: Optional[str] = None) -> str:
+    """Reports the status of a background image job and, once done, its artifact names.
+
+    Jobs started on another server instance are read from the status the
+    job saves in this session's artifacts, so they show their last recorded
+    state without progress details. A job whose instance stopped while it
+    ran stays "running" there.
+
+    Args:
+        tool_context: The tool context.
+        job_id: The job ID returned when the job was started. If omitted, lists
+            every job in this session.
+
+    Returns:
+        The job status, with the saved artifact names when the job is done.
+    """
+    session_key = DetachedArtifactContext(tool_context).session_key
+    manager = get_job_manager()
+    if job_id:
+        job_id = job_id.strip().strip("`")
+        job = manager.get(job_id, session_key)
+        if job is None and manager.persist:
+            job = await _load_persisted_job(tool_context, job_id)
+        if job is None:
+            return f"Error: No job `{job_id}` found in this session."
+        return job.describe()
+
+    jobs = {job.job_id: job for job in manager.session_jobs(session_key)}
+    if manager.persist:
+        for filename in await tool_context.list_artifacts():
+            if not (filename.startswith(_JOB_ARTIFACT_PREFIX) and filename.endswith(".json")):
+                continue
+            persisted_id = filename[len(_JOB_ARTIFACT_PREFIX):-len(".json")]
+            if persisted_id not in jobs:
+                job = await _load_persisted_job(tool_context, persisted_id)
+                if job is not None:
+                    jobs[persisted_id] = job
+    if not jobs:
+        return "There are no background jobs in this session."
+    ordered = sorted(jobs.values(), key=lambda job: job.created_at)
+    return "\n".join(f"- {job.describe()}" for job in ordered)
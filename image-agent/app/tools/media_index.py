@@ -0,0 +1,132 @@
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def part_media_names(part: Any) -> Tuple[Optional[str], str]:
+    """Returns (display_name, file_uri) for an inline_data/file_data part."""
+    # Standardize metadata access
+    d_name = None
+    uri = ""
+
+    if part.inline_data:
+        inline_d = part.inline_data
+        if isinstance(inline_d, dict): d_name = inline_d.get("display_name")
+        else: d_name = getattr(inline_d, "display_name", None)
+    elif part.file_data:
+        file_d = part.file_data
+        if isinstance(file_d, dict):
+            uri = file_d.get("file_uri", "") or ""
+            d_name = file_d.get("display_name")
+        else:
+            uri = getattr(file_d, "file_uri", "") or ""
+            d_name = getattr(file_d, "display_name", None)
+
+    return d_name, uri
+
+
+def matches_media_name(part: Any, name: str) -> bool:
+    d_name, uri = part_media_names(part)
+    return d_name == name or bool(uri and uri.endswith(f"/{name}"))
+
+
+class SessionMediaIndex:
+    """Maps display names and URI basenames to media parts of one session.
+
+    Session events are append-only, so the index only walks events it has not
+    seen yet; lookups are a dict access regardless of session length. Entries
+    are (event index, part index) positions resolved against the session's
+    current events, so the index never keeps inline image bytes alive.
+    """
+
+    def __init__(self):
+        self._positions: Dict[str, Tuple[int, int]] = {}
+        self._indexed_events = 0
+        self._lock = threading.Lock()
+
+    def _add_part(self, part: Any, position: Tuple[int, int]) -> None:
+        d_name, uri = part_media_names(part)
+        # Keep the first occurrence, matching the original in-order scan.
+        if d_name:
+            self._positions.setdefault(d_name, position)
+        if uri and "/" in uri:
+            self._positions.setdefault(uri.rsplit("/", 1)[1], position)
+
+    def _sync_locked(self, events: List[Any], rebuild: bool = False) -> None:
+        if rebuild or len(events) < self._indexed_events:
+            # The session was rewound or replaced; start over.
+            self._positions.clear()
+            self._indexed_events = 0
+        for event_index in range(self._indexed_events, len(events)):
+            content = getattr(events[event_index], "content", None)
+            if content and content.parts:
+                for part_index, part in enumerate(content.parts):
+                    if part.inline_data or part.file_data:
+                        self._add_part(part, (event_index, part_index))
+        self._indexed_events = len(events)
+
+    def sync(self, events: List[Any]) -> None:
+        """Indexes events appended since the last sync."""
+        with self._lock:
+            self._sync_locked(events)
+
+    @staticmethod
+    def _part_at(events: List[Any], position: Tuple[int, int]) -> Optional[Any]:
+        event_index, part_index = position
+        if event_index >= len(events):
+            return None
+        content = getattr(events[event_index], "content", None)
+        if not content or not content.parts or part_index >= len(content.parts):
+            return None
+        return content.parts[part_index]
+
+    def lookup(self, name: str, events: List[Any]) -> Optional[Any]:
+        """Returns the first media part named `name` in `events`, the list last synced."""
+        with self._lock:
+            position = self._positions.get(name)
+            if position is None:
+                return None
+            part = self._part_at(events, position)
+            if part is not None and (part.inline_data or part.file_data) and matches_media_name(part, name):
+                return part
+            # Same length but different events: the session was replaced.
+            self._sync_locked(events, rebuild=True)
+            position = self._positions.get(name)
+            return self._part_at(events, position) if position else None
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+
+_MAX_SESSIONS = 1024
+_indexes: "OrderedDict[str, SessionMediaIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_session_media_index(session: Any) -> SessionMediaIndex:
+    """Returns the up-to-date media index for a session."""
+    session_id = getattr(session, "id", None) or str(id(session))
+    with _indexes_lock:
+        index = _indexes.get(session_id)
+        if index is None:
+            index = SessionMediaIndex()
+            _indexes[session_id] = index
+            while len(_indexes) > _MAX_SESSIONS:
+                _indexes.popitem(last=False)
+        else:
+            _indexes.move_to_end(session_id)
+    index.sync(session.events or [])
+    return index
+
+
+def find_media_part(contents: Iterable[Any], name: str) -> Optional[Any]:
+    """Linear scan over contents, for small inputs such as the current user turn."""
+    for content in contents:
+        if not content or not content.parts: continue
+        for part in content.parts:
+            if (part.inline_data or part.file_data) and matches_media_name(part, name):
+                return part
+    return None
@@ -0,0 +1,105 @@
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# In-process metric store shared by all image tools. Values are mirrored to
+# OpenTelemetry when it is available so they show up next to the GenAI
+# telemetry configured in app_utils/telemetry.py.
+_lock = threading.Lock()
+_counters: Dict[str, float] = defaultdict(float)
+_gauges: Dict[str, float] = {}
+# Latest value per attribute set, read back by the OTel observable gauges.
+_gauge_points: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = {}
+_histograms: Dict[str, Dict[str, float]] = {}
+_otel_instruments: Dict[str, object] = {}
+_meter = None
+
+
+def _get_meter():
+    global _meter
+    if _meter is None:
+        try:
+            from opentelemetry import metrics as otel_metrics
+
+            _meter = otel_metrics.get_meter("image_agent.tools")
+        except ImportError:
+            _meter = False
+    return _meter
+
+
+def _otel_instrument(name: str, kind: str):
+    instrument = _otel_instruments.get(name)
+    if instrument is None:
+        meter = _get_meter()
+        if not meter:
+            return None
+        if kind == "counter":
+            instrument = meter.create_counter(name)
+        elif kind == "gauge":
+            instrument = meter.create_observable_gauge(name, callbacks=[_gauge_callback(name)])
+        else:
+            instrument = meter.create_histogram(name)
+        _otel_instruments[name] = instrument
+    return instrument
+
+
+def _gauge_callback(name: str):
+    def callback(options):
+        from opentelemetry.metrics import Observation
+
+        with _lock:
+            points = list(_gauge_points.get(name, {}).items())
+        return [Observation(value, attributes=dict(key) or None) for key, value in points]
+
+    return callback
+
+
+def incr(name: str, value: float = 1, **attributes) -> None:
+    """Increments a counter."""
+    with _lock:
+        _counters[name] += value
+        instrument = _otel_instrument(name, "counter")
+    if instrument is not None:
+        instrument.add(value, attributes=attributes or None)
+
+
+def set_gauge(name: str, value: float, **attributes) -> None:
+    """Sets a gauge to its current value.
+
+    Each attribute set is its own series; in snapshot() it appears as
+    `name.<attribute values>`.
+    """
+    key = tuple(sorted((k, str(v)) for k, v in attributes.items()))
+    with _lock:
+        _gauges[".".join([name, *(v for _, v in key)])] = value
+        _gauge_points.setdefault(name, {})[key] = value
+        # Observable: OTel pulls the latest value from _gauge_points on export.
+        _otel_instrument(name, "gauge")
+
+
+def observe(name: str, value: float, **attributes) -> None:
+    """Records a sample (latency, size, ...) for a histogram."""
+    with _lock:
+        hist = _histograms.setdefault(name, {"count": 0, "sum": 0.0, "max": 0.0})
+        hist["count"] += 1
+        hist["sum"] += value
+        hist["max"] = max(hist["max"], value)
+        instrument = _otel_instrument(name, "histogram")
+    if instrument is not None:
+        instrument.record(value, attributes=attributes or None)
+
+
+def snapshot(prefix: Optional[str] = None) -> Dict[str, float]:
+    """Returns a flat copy of all metrics, optionally filtered by name prefix."""
+    with _lock:
+        result: Dict[str, float] = dict(_counters)
+        result.update(_gauges)
+        for name, hist in _histograms.items():
+            for key, value in hist.items():
+                result[f"{name}.{key}"] = value
+    if prefix:
+        result = {k: v for k, v in result.items() if k.startswith(prefix)}
+    return result
@@ -0,0 +1,169 @@
+import asyncio
+import os
+import random
+import time
+import threading
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from tools import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.environ.get(name, default))
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """True for 429 / RESOURCE_EXHAUSTED responses from the Vertex AI endpoints."""
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if code == 429:
+        return True
+    status = getattr(error, "status", None)
+    if isinstance(status, str) and status.upper() == "RESOURCE_EXHAUSTED":
+        return True
+    message = str(error)
+    return "RESOURCE_EXHAUSTED" in message or "429" in message.split(" ", 1)[0]
+
+
+class AdaptiveTokenBucket:
+    """Token bucket whose refill rate adapts to quota feedback (AIMD).
+
+    Every success adds `increase_step` requests/s up to `max_rate`; every
+    throttle (429) multiplies the rate by `decrease_factor`, down to `min_rate`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: float,
+        min_rate: float,
+        max_rate: float,
+        increase_step: float,
+        decrease_factor: float = 0.5,
+    ):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._waiting = 0
+        # A thread lock, not an asyncio one: limiters are shared by every event
+        # loop in the process (serving loops and the background job loop).
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        # Take the token up front, going into debt if none is left, and sleep
+        # off the debt outside the lock. Waiters are served in arrival order.
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self._waiting += 1
+            metrics.set_gauge("rate_limit.queue_depth", self._waiting, limiter=self.name)
+        try:
+            if wait > 0:
+                await asyncio.sleep(wait)
+        except BaseException:
+            with self._lock:
+                self._tokens += 1  # hand the reserved token back
+            raise
+        finally:
+            with self._lock:
+                self._waiting -= 1
+                metrics.set_gauge("rate_limit.queue_depth", self._waiting, limiter=self.name)
+        if wait > 0.001:
+            metrics.observe("rate_limit.wait_s", wait, limiter=self.name)
+
+    def on_success(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.increase_step)
+        metrics.set_gauge("rate_limit.rate", self.rate, limiter=self.name)
+
+    def on_throttle(self) -> None:
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            # Drop any saved-up burst so the backlog does not immediately retrip the quota.
+            self._tokens = min(self._tokens, 0.0)
+        metrics.incr("rate_limit.throttle_events", limiter=self.name)
+        metrics.set_gauge("rate_limit.rate", self.rate, limiter=self.name)
+
+
+_limiters: Dict[Tuple[str, str], AdaptiveTokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model: str, region: str) -> AdaptiveTokenBucket:
+    """Returns the process-wide limiter for (model, region).
+
+    Configuration (environment):
+        MODEL_RATE_LIMIT_QPS: initial requests/s per model and region (default 2).
+        MODEL_RATE_LIMIT_BURST: bucket size (default 4).
+        MODEL_RATE_LIMIT_MIN_QPS / MODEL_RATE_LIMIT_MAX_QPS: adaptation bounds (0.05 / 20).
+        MODEL_RATE_LIMIT_INCREASE: additive increase per success (default 0.05).
+    """
+    key = (model, region)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = AdaptiveTokenBucket(
+                name=f"{model}@{region}",
+                rate=_env_float("MODEL_RATE_LIMIT_QPS", 2.0),
+                burst=_env_float("MODEL_RATE_LIMIT_BURST", 4.0),
+                min_rate=_env_float("MODEL_RATE_LIMIT_MIN_QPS", 0.05),
+                max_rate=_env_float("MODEL_RATE_LIMIT_MAX_QPS", 20.0),
+                increase_step=_env_float("MODEL_RATE_LIMIT_INCREASE", 0.05),
+            )
+            _limiters[key] = limiter
+        return limiter
+
+
+async def call_with_rate_limit(
+    model: str,
+    region: str,
+    call: Callable[[], Awaitable[T]],
+    max_attempts: Optional[int] = None,
+) -> T:
+    """Runs a model call through the (model, region) limiter, retrying 429s.
+
+    Retries use full-jitter exponential backoff. Errors other than quota
+    exhaustion are raised immediately.
+    """
+    if max_attempts is None:
+        max_attempts = int(os.environ.get("MODEL_RATE_LIMIT_MAX_ATTEMPTS", "4"))
+    base_delay = _env_float("MODEL_RATE_LIMIT_BACKOFF_S", 1.0)
+    max_delay = _env_float("MODEL_RATE_LIMIT_MAX_BACKOFF_S", 30.0)
+
+    limiter = get_rate_limiter(model, region)
+    for attempt in range(1, max_attempts + 1):
+        await limiter.acquire()
+        try:
+            result = await call()
+        except Exception as e:
+            if not is_rate_limit_error(e):
+                raise
+            limiter.on_throttle()
+            if attempt == max_attempts:
+                metrics.incr("rate_limit.exhausted", limiter=limiter.name)
+                logger.error(f"Quota exhausted for {limiter.name} after {attempt} attempts: {e}")
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+            metrics.incr("rate_limit.retries", limiter=limiter.name)
+            logger.warning(f"Throttled by {limiter.name} (attempt {attempt}/{max_attempts}); retrying in {delay:.2f}s at {limiter.rate:.2f} req/s")
+            await asyncio.sleep(delay)
+        else:
+            limiter.on_success()
+            return result
+    raise RuntimeError("unreachable")
@@ -0,0 +1,226 @@
+import asyncio
+import os
+import time
+import threading
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+
+from tools import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Latency samples kept per region for percentile estimates.
+_SAMPLE_WINDOW = 200
+
+
+def is_retriable_in_other_region(error: BaseException) -> bool:
+    """Timeouts, quota and server errors may succeed elsewhere; bad requests will not."""
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if isinstance(code, int):
+        return code == 429 or code >= 500
+    return True
+
+
+class RegionStats:
+    """Rolling health of one region: EWMA latency and error rate plus a sample window."""
+
+    def __init__(self, region: str, alpha: float = 0.2):
+        self.region = region
+        self.alpha = alpha
+        self.latency_ewma: Optional[float] = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.samples: Deque[float] = deque(maxlen=_SAMPLE_WINDOW)
+
+    def record(self, latency_s: float, ok: bool) -> None:
+        # Failures feed the EWMA too, so timeouts count as slow.
+        if self.latency_ewma is None:
+            self.latency_ewma = latency_s
+        else:
+            self.latency_ewma += self.alpha * (latency_s - self.latency_ewma)
+        if ok:
+            self.samples.append(latency_s)
+            self.consecutive_failures = 0
+        else:
+            self.consecutive_failures += 1
+        self.error_rate += self.alpha * ((0.0 if ok else 1.0) - self.error_rate)
+
+    def score(self, error_penalty_s: float) -> float:
+        # Unsampled regions score 0 so they get tried (ties keep configured order).
+        # Errors cost `error_penalty_s` each, so fast failures do not look healthy.
+        latency = self.latency_ewma or 0.0
+        return latency * (1.0 + 4.0 * self.error_rate) + error_penalty_s * self.error_rate
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class RegionPool:
+    """Routes calls for one model to the healthiest region and fails over on errors."""
+
+    def __init__(
+        self,
+        model: str,
+        regions: List[str],
+        timeout_s: float = 120.0,
+        failure_threshold: int = 3,
+        cooldown_s: float = 30.0,
+    ):
+        if not regions:
+            raise ValueError(f"No regions configured for {model}")
+        self.model = model
+        self.regions = list(regions)
+        self.timeout_s = timeout_s
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self.stats: Dict[str, RegionStats] = {region: RegionStats(region) for region in regions}
+        self._lock = threading.Lock()
+
+    def ranked_regions(self) -> List[str]:
+        """Regions ordered best first; regions in cooldown go last."""
+        now = time.monotonic()
+        with self._lock:
+            order = {region: i for i, region in enumerate(self.regions)}
+            return sorted(
+                self.regions,
+                key=lambda r: (self.stats[r].cooldown_until > now, self.stats[r].score(self.timeout_s), order[r]),
+            )
+
+    def record(self, region: str, latency_s: float, ok: bool) -> None:
+        with self._lock:
+            stats = self.stats[region]
+            stats.record(latency_s, ok)
+            if not ok and stats.consecutive_failures >= self.failure_threshold:
+                stats.cooldown_until = time.monotonic() + self.cooldown_s
+                logger.warning(f"Region {region} for {self.model} in cooldown for {self.cooldown_s}s after {stats.consecutive_failures} failures")
+        metrics.observe("region_pool.latency_s", latency_s, model=self.model, region=region)
+        metrics.incr("region_pool.calls" if ok else "region_pool.errors", model=self.model, region=region)
+
+    def latency_percentile(self, q: float, region: Optional[str] = None) -> Optional[float]:
+        """Latency percentile for one region, or across all regions."""
+        with self._lock:
+            if region:
+                return self.stats[region].percentile(q)
+            samples = sorted(s for stats in self.stats.values() for s in stats.samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(round(q / 100.0 * (len(samples) - 1))))]
+
+    async def call_in(self, region: str, call: Callable[[str], Awaitable[T]]) -> T:
+        """Runs `call(region)` with the pool timeout and records the outcome."""
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(call(region), self.timeout_s)
+        except Exception as e:
+            # A rejected request says nothing about the region's health.
+            if is_retriable_in_other_region(e):
+                self.record(region, time.monotonic() - started, ok=False)
+            raise
+        self.record(region, time.monotonic() - started, ok=True)
+        return result
+
+    async def call(self, call: Callable[[str], Awaitable[T]]) -> T:
+        """Runs `call(region)` in the healthiest region, failing over on errors or timeouts."""
+        last_error: Optional[BaseException] = None
+        for attempt, region in enumerate(self.ranked_regions()):
+            try:
+                return await self.call_in(region, call)
+            except Exception as e:
+                last_error = e
+                if not is_retriable_in_other_region(e):
+                    raise
+                metrics.incr("region_pool.failovers", model=self.model, region=region)
+                logger.warning(f"{self.model} failed in {region} (attempt {attempt + 1}/{len(self.regions)}): {e!r}")
+        assert last_error is not None
+        raise last_error
+
+    async def hedged_call(
+        self,
+        call: Callable[[str], Awaitable[T]],
+        percentile: float = 95.0,
+        min_delay_s: float = 1.0,
+        default_delay_s: float = 30.0,
+        cross_region: bool = True,
+    ) -> T:
+        """Runs `call` in the best region and hedges it if it is slow.
+
+        If the first attempt has not finished after the region's `percentile`
+        latency (or `default_delay_s` before any samples exist), a duplicate is
+        fired, in the next-best region when `cross_region` is set. The first
+        successful result wins and the other attempt is cancelled. A fast
+        retriable failure fires the hedge immediately.
+        """
+        ranked = self.ranked_regions()
+        primary = ranked[0]
+        hedge_region = ranked[1] if cross_region and len(ranked) > 1 else primary
+        delay = self.latency_percentile(percentile, primary)
+        delay = max(min_delay_s, delay if delay is not None else default_delay_s)
+
+        metrics.incr("hedge.requests", model=self.model)
+        primary_task = asyncio.ensure_future(self.call_in(primary, call))
+        hedge_task = None
+        try:
+            done, _ = await asyncio.wait({primary_task}, timeout=delay)
+            if done:
+                error = primary_task.exception()
+                if error is None:
+                    return primary_task.result()
+                if not is_retriable_in_other_region(error):
+                    raise error
+
+            metrics.incr("hedge.fired", model=self.model, region=hedge_region)
+            logger.info(f"Hedging {self.model}: no response from {primary} after {delay:.2f}s, duplicating to {hedge_region}")
+            hedge_task = asyncio.ensure_future(self.call_in(hedge_region, call))
+
+            pending = {hedge_task} if primary_task.done() else {primary_task, hedge_task}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge_task:
+                            metrics.incr("hedge.won", model=self.model, region=hedge_region)
+                        return task.result()
+
+            # Both attempts failed; surface the primary error.
+            return primary_task.result()
+        finally:
+            for task in (primary_task, hedge_task):
+                if task is not None and not task.done():
+                    task.cancel()
+
+
+_pools: Dict[str, RegionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_region_pool(model: str, regions_env: str, region_env: str, default_region: str = "us-central1") -> RegionPool:
+    """Returns the process-wide region pool for a model.
+
+    Regions come from `regions_env` (comma separated, best first), falling back
+    to the single-region `region_env` variable. MODEL_REGION_TIMEOUT_S bounds
+    each attempt before failing over (default 120s).
+    """
+    with _pools_lock:
+        pool = _pools.get(model)
+        if pool is None:
+            configured = os.environ.get(regions_env, "")
+            regions = [r.strip() for r in configured.split(",") if r.strip()]
+            if not regions:
+                regions = [os.environ.get(region_env, default_region)]
+            pool = RegionPool(
+                model,
+                regions,
+                timeout_s=float(os.environ.get("MODEL_REGION_TIMEOUT_S", "120")),
+            )
+            _pools[model] = pool
+        return pool
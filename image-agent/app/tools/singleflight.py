@@ -0,0 +1,37 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, TypeVar
+
+from tools import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one in-flight call.
+
+    The first caller for a key starts the work; callers arriving while it is
+    running await the same result (or exception). A waiter being cancelled
+    does not cancel the shared call for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[str, "asyncio.Future"] = {}
+
+    async def do(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is not None:
+            metrics.incr(f"singleflight.{self.name}.coalesced")
+            logger.info(f"Coalescing duplicate {self.name} request {key[:12]} onto the in-flight call")
+        else:
+            metrics.incr(f"singleflight.{self.name}.leaders")
+            task = asyncio.ensure_future(call())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def inflight(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,149 @@
+import io
+import os
+import math
+import logging
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (left, top, right, bottom) in source pixels.
+Box = Tuple[int, int, int, int]
+
+# Splitting and stitching decode whole images and do per-pixel math, so they run
+# in worker processes. "spawn" avoids forking a process that holds gRPC threads.
+_tile_pool: Optional[ProcessPoolExecutor] = None
+_tile_pool_lock = threading.Lock()
+
+
+def _get_tile_pool() -> ProcessPoolExecutor:
+    global _tile_pool
+    with _tile_pool_lock:
+        if _tile_pool is None:
+            _tile_pool = ProcessPoolExecutor(
+                max_workers=int(os.environ.get("IMAGE_TILE_WORKERS", "2")),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _tile_pool
+
+
+async def run_in_tile_pool(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_get_tile_pool(), func, *args)
+
+
+def tile_size_for(multiplier: int, max_output_pixels: int) -> int:
+    """Largest square source tile whose upscaled output stays within `max_output_pixels`."""
+    return int(math.isqrt(max_output_pixels) // multiplier)
+
+
+def _axis_starts(length: int, tile: int, overlap: int) -> List[int]:
+    if length <= tile:
+        return [0]
+    step = tile - overlap
+    starts = list(range(0, length - tile, step))
+    starts.append(length - tile)  # last tile sits flush with the edge
+    return starts
+
+
+def tile_grid(width: int, height: int, tile: int, overlap: int) -> List[Box]:
+    """Overlapping tiles of at most `tile` x `tile` covering a width x height image."""
+    if overlap * 2 >= tile:
+        raise ValueError(f"Tile overlap {overlap} is too large for {tile}px tiles")
+    return [
+        (left, top, min(left + tile, width), min(top + tile, height))
+        for top in _axis_starts(height, tile, overlap)
+        for left in _axis_starts(width, tile, overlap)
+    ]
+
+
+def _has_alpha(image) -> bool:
+    return "A" in image.getbands() or "transparency" in image.info
+
+
+def split_tiles(data: bytes, boxes: List[Box]) -> List[bytes]:
+    """Crops `boxes` out of an encoded image and returns each crop as PNG bytes.
+
+    Crops are RGBA when the source has any transparency, RGB otherwise.
+    """
+    from PIL import Image
+
+    tiles = []
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert("RGBA" if _has_alpha(image) else "RGB")
+        for box in boxes:
+            out = io.BytesIO()
+            image.crop(box).save(out, format="PNG")
+            tiles.append(out.getvalue())
+    return tiles
+
+
+def _edge_ramp(length: int, ramp: int, fade_start: bool, fade_end: bool):
+    import numpy as np
+
+    weights = np.ones(length, dtype=np.float32)
+    ramp = min(ramp, length // 2)
+    if ramp > 0:
+        # Strictly positive so every output pixel has some weight.
+        rising = np.linspace(0.0, 1.0, ramp + 2, dtype=np.float32)[1:-1]
+        if fade_start:
+            weights[:ramp] = rising
+        if fade_end:
+            weights[-ramp:] = rising[::-1]
+    return weights
+
+
+def stitch_tiles(
+    tiles: List[bytes],
+    boxes: List[Box],
+    multiplier: int,
+    size: Tuple[int, int],
+    overlap: int,
+) -> bytes:
+    """Places upscaled tiles on a `multiplier`x canvas, feathering the overlaps.
+
+    Each tile is weighted by a separable linear ramp across `overlap` (scaled)
+    pixels on every edge it shares with a neighbour; the canvas is the
+    weighted sum divided by the summed weights. The result keeps an alpha
+    channel when any tile has one. Returns PNG bytes.
+    """
+    import numpy as np
+    from PIL import Image
+
+    mode = "RGB"
+    for data in tiles:
+        with Image.open(io.BytesIO(data)) as tile:  # header only
+            if _has_alpha(tile):
+                mode = "RGBA"
+                break
+
+    width, height = size
+    out_w, out_h = width * multiplier, height * multiplier
+    accum = np.zeros((out_h, out_w, len(mode)), dtype=np.float32)
+    weight_sum = np.zeros((out_h, out_w), dtype=np.float32)
+    ramp = overlap * multiplier
+
+    for data, (left, top, right, bottom) in zip(tiles, boxes, strict=True):
+        box_w, box_h = (right - left) * multiplier, (bottom - top) * multiplier
+        with Image.open(io.BytesIO(data)) as tile:
+            tile = tile.convert(mode)
+            if tile.size != (box_w, box_h):
+                # Guard against off-by-one output sizes from the model.
+                tile = tile.resize((box_w, box_h), Image.Resampling.LANCZOS)
+            pixels = np.asarray(tile, dtype=np.float32)
+
+        weights = np.outer(
+            _edge_ramp(box_h, ramp, top > 0, bottom < height),
+            _edge_ramp(box_w, ramp, left > 0, right < width),
+        )
+        y0, x0 = top * multiplier, left * multiplier
+        accum[y0:y0 + box_h, x0:x0 + box_w] += pixels * weights[..., None]
+        weight_sum[y0:y0 + box_h, x0:x0 + box_w] += weights
+
+    accum /= weight_sum[..., None]  # in place; the canvas can be tens of megapixels
+    np.rint(accum, out=accum)
+    out = io.BytesIO()
+    Image.fromarray(np.clip(accum, 0, 255, out=accum).astype(np.uint8)).save(out, format="PNG")
+    return out.getvalue()
@@ -1,125 +1,314 @@
 from google.adk.tools import ToolContext
-from google import genai
 from google.genai import types
 import os
+import time
+import asyncio
+import hashlib
 import logging
-from typing import Optional
-from tools.artifacts import load_image_from_artifact
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from tools.artifacts import load_image_bytes_from_artifact
+from tools import metrics
+from tools.clients import get_genai_client
+from tools.rate_limit import call_with_rate_limit
+from tools.regions import RegionPool, get_region_pool
+from tools.singleflight import SingleFlight
+from tools.cache import CacheEntry, CachedImage, get_result_cache, make_cache_key
+from tools.image_formats import detect_mime_type, probe_dimensions
+from tools.image_store import save_image_artifact
+from tools.jobs import JobResult, submit_image_job
+from tools.tiling import run_in_tile_pool, split_tiles, stitch_tiles, tile_grid, tile_size_for
 
 logger = logging.getLogger(__name__)
 
+_upscale_flight = SingleFlight("upscale")
+
+def normalize_upscale_factor(scale_factor: Optional[float]) -> str:
+    """Maps a numeric scale factor to the upscale API's "x2"/"x4" values."""
+    # The API only supports specific factors like x2, x4.
+    # Generally users pass 2.0 or 4.0; anything below 4 is treated as x2.
+    if scale_factor and scale_factor >= 4.0:
+        return "x4"
+    return "x2"
+
+
+_FACTOR_MULTIPLIERS = {"x2": 2, "x4": 4}
+
+
+class UpscaleLimitError(ValueError):
+    """The input is already too large for the upscale model to enlarge further."""
+
+
+def max_output_pixels() -> int:
+    """Largest output the upscale model accepts (IMAGE_UPSCALE_MAX_OUTPUT_PIXELS, default 17 MP)."""
+    return int(os.environ.get("IMAGE_UPSCALE_MAX_OUTPUT_PIXELS", "17000000"))
+
+
+def _tiling_enabled() -> bool:
+    return os.environ.get("IMAGE_UPSCALE_TILING", "true").lower() in ("1", "true", "yes")
+
+
+def max_tiled_output_pixels() -> int:
+    """Cap on stitched output (IMAGE_UPSCALE_TILED_MAX_OUTPUT_PIXELS, default 40 MP).
+
+    Stitching holds a float32 canvas in memory, about 16 bytes per output pixel.
+    """
+    return int(os.environ.get("IMAGE_UPSCALE_TILED_MAX_OUTPUT_PIXELS", "40000000"))
+
+
+@dataclass
+class UpscalePlan:
+    factor: str
+    requested_factor: str
+    input_size: Optional[Tuple[int, int]] = None
+    tiled: bool = False
+
+    @property
+    def output_size(self) -> Optional[Tuple[int, int]]:
+        if not self.input_size:
+            return None
+        multiplier = _FACTOR_MULTIPLIERS[self.factor]
+        return self.input_size[0] * multiplier, self.input_size[1] * multiplier
+
+    def describe(self) -> str:
+        """Short human-readable summary for tool responses."""
+        if not self.input_size:
+            return f"{self.factor} (input dimensions unknown)"
+        (width, height), (out_width, out_height) = self.input_size, self.output_size
+        text = f"{width}x{height} -> {out_width}x{out_height} ({self.factor}{', tiled' if self.tiled else ''})"
+        if self.factor != self.requested_factor:
+            if self.tiled:
+                limit = f"{max_tiled_output_pixels() / 1e6:.0f} MP tiled output limit"
+            else:
+                limit = f"{max_output_pixels() / 1e6:.0f} MP output limit"
+            text += f", reduced from {self.requested_factor} to stay within the {limit}"
+        return text
+
+
+def plan_upscale(image_bytes: bytes, scale_factor: Optional[float]) -> UpscalePlan:
+    """Chooses the upscale factor from the image header before any model call.
+
+    The requested factor is lowered from x4 to x2 when x4 would exceed the
+    model's output limit. Inputs too large for a single call are upscaled in
+    tiles when IMAGE_UPSCALE_TILING is on and the stitched result stays within
+    max_tiled_output_pixels(). Images whose dimensions cannot be read from the
+    header are passed through with the requested factor.
+
+    Raises:
+        UpscaleLimitError: If no single or tiled upscale fits the output limits.
+    """
+    requested = normalize_upscale_factor(scale_factor)
+    size = probe_dimensions(image_bytes)
+    if size is None:
+        return UpscalePlan(factor=requested, requested_factor=requested)
+
+    width, height = size
+    limit = max_output_pixels()
+    candidates = ("x4", "x2") if requested == "x4" else ("x2",)
+    for factor in candidates:
+        multiplier = _FACTOR_MULTIPLIERS[factor]
+        if width * height * multiplier * multiplier <= limit:
+            return UpscalePlan(factor=factor, requested_factor=requested, input_size=size)
+    if _tiling_enabled():
+        limit = max_tiled_output_pixels()
+        for factor in candidates:
+            multiplier = _FACTOR_MULTIPLIERS[factor]
+            if width * height * multiplier * multiplier <= limit:
+                return UpscalePlan(factor=factor, requested_factor=requested, input_size=size, tiled=True)
+
+    metrics.incr("upscale.rejected_too_large")
+    raise UpscaleLimitError(
+        f"The image is already {width}x{height}; upscaling it {requested} would exceed "
+        f"the {limit / 1e6:.0f} MP the upscale model supports, so it was not upscaled."
+    )
+
+
+def upscale_model_name() -> str:
+    return os.environ.get("IMAGE_UPSCALE_MODEL", "imagen-4.0-upscale-preview")
+
+
+def upscale_region_pool(model_name: str) -> RegionPool:
+    """The region pool upscale calls for `model_name` are routed through."""
+    return get_region_pool(model_name, "IMAGE_UPSCALE_MODEL_REGIONS", "IMAGE_UPSCALE_MODEL_REGION")
+
+
+async def _upscale_bytes(image_bytes: bytes, upscale_factor: str, model_name: str) -> bytes:
+    """Calls the Imagen upscale model and returns the upscaled image bytes."""
+    project_id = os.environ.get("GOOGLE_CLOUD_PROJECT")
+    source_image = types.Image(image_bytes=image_bytes, mime_type=detect_mime_type(image_bytes))
+    pool = upscale_region_pool(model_name)
+
+    async def call_region(location: str):
+        logger.info(f"Step [upscale_image]: Invoking client.aio.models.upscale_image with model={model_name}, factor={upscale_factor}, location={location}")
+        client = get_genai_client(location=location, project=project_id)
+        return await call_with_rate_limit(
+            model_name,
+            location,
+            lambda: client.aio.models.upscale_image(
+                model=model_name,
+                image=source_image,
+                upscale_factor=upscale_factor
+            ),
+        )
+
+    if os.environ.get("IMAGE_UPSCALE_HEDGE", "false").lower() in ("1", "true", "yes"):
+        # Duplicate slow calls past the observed latency percentile to cut the tail.
+        response = await pool.hedged_call(
+            call_region,
+            percentile=float(os.environ.get("IMAGE_UPSCALE_HEDGE_PERCENTILE", "95")),
+            min_delay_s=float(os.environ.get("IMAGE_UPSCALE_HEDGE_MIN_DELAY_S", "2")),
+            default_delay_s=float(os.environ.get("IMAGE_UPSCALE_HEDGE_DEFAULT_DELAY_S", "30")),
+            cross_region=os.environ.get("IMAGE_UPSCALE_HEDGE_CROSS_REGION", "true").lower() in ("1", "true", "yes"),
+        )
+    else:
+        # Healthiest configured region first, failing over on errors/timeouts.
+        response = await pool.call(call_region)
+
+    logger.info("Step [upscale_image]: Model generation complete.")
+
+    # Based on library patterns:
+    if hasattr(response, "generated_images") and response.generated_images:
+         return response.generated_images[0].image.image_bytes
+    elif hasattr(response, "image"):
+         # Some endpoints return single image
+         return response.image.image_bytes
+    # Fallback: let standard attribute access raise a meaningful error.
+    return response.generated_images[0].image.image_bytes
+
+
+def upscaled_artifact_stem(source_name: str) -> str:
+    """Returns the artifact name, minus extension, for the upscaled version of `source_name`."""
+    return f"upscaled_{os.path.splitext(source_name)[0]}"
+
+
+async def upscale_with_cache(image_bytes: bytes, upscale_factor: str) -> bytes:
+    """Upscales image bytes, serving repeats of the same source and factor from cache."""
+    model_name = upscale_model_name()
+
+    # Same source bytes + factor + model always yield the same output, so
+    # repeat upscales only cost one hash.
+    cache = get_result_cache("upscale")
+    cache_key = make_cache_key(model_name, hashlib.sha256(image_bytes).hexdigest(), upscale_factor)
+
+    async def produce() -> bytes:
+        cached = await cache.get(cache_key) if cache else None
+        if cached is not None:
+            logger.info(f"Step [upscale_image]: Cache hit for factor={upscale_factor}, skipping model call.")
+            return cached.images[0].data
+
+        started = time.monotonic()
+        generated_image_bytes = await _upscale_bytes(image_bytes, upscale_factor, model_name)
+        if cache:
+            await cache.put(cache_key, CacheEntry(
+                images=[CachedImage(data=generated_image_bytes, mime_type=detect_mime_type(generated_image_bytes))],
+                latency_s=time.monotonic() - started,
+            ))
+        return generated_image_bytes
+
+    # Concurrent upscales of the same bytes share one in-flight model call.
+    return await _upscale_flight.do(cache_key, produce)
+
+
+async def upscale_tiled(image_bytes: bytes, plan: UpscalePlan) -> bytes:
+    """Upscales an oversized image as overlapping tiles and stitches the result.
+
+    Tiles are sized so each upscaled tile fits the model's output limit and go
+    through upscale_with_cache, so they share the rate limiter, region pool and
+    result cache with every other upscale. IMAGE_UPSCALE_TILE_OVERLAP sets the
+    overlap in source pixels (default 64); IMAGE_UPSCALE_TILE_CONCURRENCY caps
+    simultaneous tile calls (default 4).
+    """
+    multiplier = _FACTOR_MULTIPLIERS[plan.factor]
+    overlap = int(os.environ.get("IMAGE_UPSCALE_TILE_OVERLAP", "64"))
+    boxes = tile_grid(*plan.input_size, tile_size_for(multiplier, max_output_pixels()), overlap)
+    logger.info(f"Step [upscale_image]: Tiled upscale of {plan.describe()} in {len(boxes)} tiles")
+
+    tiles = await run_in_tile_pool(split_tiles, image_bytes, boxes)
+    semaphore = asyncio.Semaphore(int(os.environ.get("IMAGE_UPSCALE_TILE_CONCURRENCY", "4")))
+
+    async def upscale_tile(tile: bytes) -> bytes:
+        async with semaphore:
+            return await upscale_with_cache(tile, plan.factor)
+
+    upscaled = await asyncio.gather(*(upscale_tile(tile) for tile in tiles))
+    metrics.incr("upscale.tiled")
+    metrics.incr("upscale.tiles", len(tiles))
+    return await run_in_tile_pool(stitch_tiles, upscaled, boxes, multiplier, plan.input_size, overlap)
+
+
+async def upscale_planned(image_bytes: bytes, plan: UpscalePlan) -> bytes:
+    """Runs a plan from plan_upscale, in one call or in tiles."""
+    if plan.tiled:
+        return await upscale_tiled(image_bytes, plan)
+    return await upscale_with_cache(image_bytes, plan.factor)
+
+
 async def upscale_image(
     tool_context: ToolContext,
     image_path: Optional[str] = None, 
     scale_factor: float = 4.0,
-    artifact_name: Optional[str] = None
+    artifact_name: Optional[str] = None,
+    background: bool = False,
 ):
     """Upscales an image.
 
     Args:
         tool_context: The tool context.
         image_path: Local path to the image file (optional).
-        scale_factor: The factor to upscale by (default: 2.0).
+        scale_factor: The factor to upscale by (default: 4.0). x4 is lowered to x2 automatically
+            when the result would exceed the model's output limit.
         artifact_name: The name of the artifact to upscale (optional). Use this if the image was generated or uploaded previously.
+        background: If True, start a background job and return its job ID immediately
+            instead of waiting; use `check_image_job` to get the result.
 
     Returns:
         A message indicating the result and the artifact name of the upscaled image.
     """
     logger.info(f"Step [upscale_image]: Started with image_path={image_path}, artifact_name={artifact_name}, scale_factor={scale_factor}")
     
-    source_image_path = ""
-    
     if artifact_name:
-        # Use our enhanced loader that checks history fallback
-        logger.info(f"Step [upscale_image]: Calling load_image_from_artifact for '{artifact_name}'")
-        source_image_path = await load_image_from_artifact(artifact_name, tool_context)
-        if not source_image_path:
+        # Use our enhanced loader that checks history fallback. Artifacts stay
+        # in memory all the way to the model call; no /tmp round trip.
+        logger.info(f"Step [upscale_image]: Loading artifact '{artifact_name}' into memory")
+        image_bytes = await load_image_bytes_from_artifact(artifact_name, tool_context)
+        if image_bytes is None:
              logger.error(f"Step [upscale_image]: Failed to load artifact '{artifact_name}'")
              return f"Error: Artifact '{artifact_name}' not found."
              
     elif image_path:
-        source_image_path = image_path
+        if not os.path.exists(image_path):
+            return f"Error: Image file not found at {image_path}"
+        with open(image_path, "rb") as f:
+             image_bytes = f.read()
     else:
         return "Error: Please provide either `image_path` or `artifact_name`."
 
-    if not os.path.exists(source_image_path):
-        return f"Error: Image file not found at {source_image_path}"
+    try:
+        # Header-only probe: reject or downgrade before spending a model call.
+        plan = plan_upscale(image_bytes, scale_factor)
+    except UpscaleLimitError as e:
+        logger.warning(f"Step [upscale_image]: {e}")
+        return f"Error: {e}"
+    logger.info(f"Step [upscale_image]: Upscale plan {plan.describe()}")
+
+    # Save straight from the response bytes to artifacts, named after the sniffed format
+    output_stem = upscaled_artifact_stem(artifact_name if artifact_name else os.path.basename(image_path))
+
+    async def run(context) -> JobResult:
+        generated_image_bytes = await upscale_planned(image_bytes, plan)
+        logger.info(f"Step [upscale_image]: Saving result '{output_stem}' to artifacts.")
+        saved = await save_image_artifact(context, output_stem, generated_image_bytes)
+        logger.info(f"Step [upscale_image]: Completed successfully. Output: {saved.filename}")
+        return f"Your image has been upscaled to `{saved.filename}` ({plan.describe()}). Details: {saved.describe()}", [saved.filename]
+
+    if background:
+        # The source is already in memory, so the job no longer needs this turn's context.
+        return submit_image_job(tool_context, "upscale", f"{artifact_name or os.path.basename(image_path)} {plan.describe()}", run)
 
     try:
-        project_id = os.environ.get("GOOGLE_CLOUD_PROJECT")
-        location = os.environ.get("IMAGE_UPSCALE_MODEL_REGION", "us-central1")
-        
-        logger.info(f"Step [upscale_image]: Initializing genai.Client with project={project_id}, location={location}")
-        
-        client = genai.Client(
-            vertexai=True,
-            project=project_id,
-            location=location
-        )
-        
-        with open(source_image_path, "rb") as f:
-             image_bytes = f.read()
-             source_image = types.Image(image_bytes=image_bytes, mime_type="image/png")
-
-        # Call the model
-        model_name = os.environ.get("IMAGE_UPSCALE_MODEL", "imagen-4.0-upscale-preview")
-        upscale_factor_str = f"x{int(scale_factor)}" if scale_factor else "x2"
-        # The API only supports specific factors like x2, x4. 
-        # For safety let's default to x2 or x4 based on input or just pass x2 if unsure.
-        # But generally users might pass 2.0 or 4.0.
-        if scale_factor >= 4.0:
-            upscale_factor_str = "x4"
-        else:
-            upscale_factor_str = "x2"
-
-        logger.info(f"Step [upscale_image]: Invoking client.models.upscale_image with model={model_name}, factor={upscale_factor_str}")
-        
-        response = client.models.upscale_image(
-            model=model_name,
-            image=source_image,
-            upscale_factor=upscale_factor_str
-        )
-        
-        logger.info("Step [upscale_image]: Model generation complete.")
-        
-        # valid response structure: response.generated_image is bytes or similar?
-        # Checking google-genai docs/usage: response usually has generated_images or similar.
-        # But for specific tasks it might be direct.
-        # Let's assume standard response object which likely has 'generated_images' list or 'image' field.
-        # Actually for upscale_image in this client validation, let's look at what return type we expect.
-        # If it returns a GeneratedImage object, we can save it.
-        # The user example just showed the call: `response = client.models.upscale_image(...)`
-        
-        # Based on library patterns:
-        if hasattr(response, "generated_images") and response.generated_images:
-             generated_image_bytes = response.generated_images[0].image.image_bytes
-        elif hasattr(response, "image"):
-             # Some endpoints return single image
-             generated_image_bytes = response.image.image_bytes
-        else:
-             # Fallback or direct bytes? expected to be wrapped.
-             # Let's try standard attribute access for types.Image
-             generated_image_bytes = response.generated_images[0].image.image_bytes
-
-        # Save the result
-        output_filename = f"upscaled_{artifact_name if artifact_name else os.path.basename(image_path)}"
-        if not output_filename.endswith(".png"):
-             output_filename += ".png"
-             
-        local_output_path = f"/tmp/{output_filename}"
-        
-        with open(local_output_path, "wb") as f:
-            f.write(generated_image_bytes)
-        
-        # Save back to artifacts
-        part = types.Part(inline_data=types.Blob(mime_type="image/png", data=generated_image_bytes))
-        logger.info(f"Step [upscale_image]: Saving result '{output_filename}' to artifacts.")
-        await tool_context.save_artifact(filename=output_filename, artifact=part)
-        
-        logger.info(f"Step [upscale_image]: Completed successfully. Output: {output_filename}")
-        return f"Your image has been upscaled to `{output_filename}`."
+        message, _ = await run(tool_context)
+        return message
 
     except Exception as e:
         logger.error(f"Error upscaling image: {e}")
         return f"Error upscaling image: {str(e)}"
-
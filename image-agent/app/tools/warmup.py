@@ -0,0 +1,136 @@
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import partial
+from typing import Any, Callable, Dict, List, Tuple
+
+from tools import metrics
+from tools.cache import persistent_cache_bucket
+from tools.clients import get_genai_client, resolve_project
+from tools.gcs import get_storage_client
+from tools.gemini_image_gen import GEMINI_IMAGE_MODEL
+from tools.upscale import upscale_model_name, upscale_region_pool
+
+logger = logging.getLogger(__name__)
+
+ALL_STEPS = ("credentials", "models", "artifacts", "codecs")
+
+
+def _warm_credentials() -> str:
+    import google.auth
+    from google.auth.transport.requests import Request
+
+    project = resolve_project()
+    credentials, _ = google.auth.default(scopes=["https://www.googleapis.com/auth/cloud-platform"])
+    credentials.refresh(Request())
+    return f"project={project}"
+
+
+def _warm_model(model: str, location: str) -> str:
+    # A metadata read: refreshes credentials and resolves/handshakes the
+    # regional endpoint without generating anything. This is the sync client;
+    # async callers get one per event loop (see get_genai_client).
+    get_genai_client(location=location).models.get(model=model)
+    return "reachable"
+
+
+def _warm_artifact_bucket(artifact_service: Any) -> str:
+    # TieredArtifactService wraps the GCS service; warm the client it really uses.
+    backend = getattr(artifact_service, "backend", artifact_service)
+    bucket = getattr(backend, "bucket", None)
+    if bucket is None:
+        return "skipped (no GCS artifact bucket)"
+    bucket.reload()
+    return f"gs://{bucket.name}"
+
+
+def _warm_cache_bucket(bucket_name: str) -> str:
+    get_storage_client().bucket(bucket_name).reload()
+    return f"gs://{bucket_name}"
+
+
+def _warm_codecs() -> str:
+    from PIL import Image
+
+    Image.init()  # registers every codec plugin up front
+    return f"{len(Image.OPEN)} formats"
+
+
+def _model_targets() -> List[Tuple[str, str]]:
+    upscale_model = upscale_model_name()
+    return [(GEMINI_IMAGE_MODEL, "global")] + [
+        (upscale_model, region) for region in upscale_region_pool(upscale_model).regions
+    ]
+
+
+def warm_up(artifact_service: Any = None) -> Dict[str, str]:
+    """Pays the first-request costs before an instance serves traffic.
+
+    Refreshes credentials, creates the pooled genai clients for every model
+    region the tools route to, looks up the artifact (and result cache) bucket
+    and loads the image codecs, in parallel. Failures are logged and never
+    stop start-up. Calls are synchronous because this runs before the serving
+    event loop exists.
+
+    Configuration (environment):
+        WARMUP_ENABLED: "true" (default) / "false".
+        WARMUP_STEPS: comma-separated subset of credentials,models,artifacts,codecs.
+        WARMUP_TIMEOUT_S: overall time limit (default 30s).
+
+    Returns:
+        A short outcome per step, e.g. {"model:...@us-central1": "ok 0.41s (reachable)"}.
+    """
+    if os.environ.get("WARMUP_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        logger.info("Warm-up disabled")
+        return {}
+    enabled = {s.strip() for s in os.environ.get("WARMUP_STEPS", ",".join(ALL_STEPS)).split(",") if s.strip()}
+    timeout_s = float(os.environ.get("WARMUP_TIMEOUT_S", "30"))
+
+    steps: List[Tuple[str, Callable[[], str]]] = []
+    if "credentials" in enabled:
+        steps.append(("credentials", _warm_credentials))
+    if "models" in enabled:
+        steps += [(f"model:{model}@{location}", partial(_warm_model, model, location)) for model, location in _model_targets()]
+    if "artifacts" in enabled:
+        if artifact_service is not None:
+            steps.append(("artifacts", partial(_warm_artifact_bucket, artifact_service)))
+        cache_bucket = persistent_cache_bucket()
+        if cache_bucket:
+            steps.append(("result_cache", partial(_warm_cache_bucket, cache_bucket)))
+    if "codecs" in enabled:
+        steps.append(("codecs", _warm_codecs))
+
+    def timed(name: str, step: Callable[[], str]) -> str:
+        started = time.monotonic()
+        ok = False
+        try:
+            detail = step()
+            ok = True
+            return f"ok {time.monotonic() - started:.2f}s ({detail})"
+        except Exception as e:
+            logger.warning(f"Warm-up step {name} failed: {e!r}")
+            return f"failed {time.monotonic() - started:.2f}s ({e})"
+        finally:
+            metrics.observe("warmup.step_s", time.monotonic() - started, step=name.split(":")[0], ok=ok)
+
+    started = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=max(1, len(steps)), thread_name_prefix="warmup")
+    futures = {executor.submit(timed, name, step): name for name, step in steps}
+    done, _ = wait(futures, timeout=timeout_s)
+    # Do not hold up start-up for stragglers; they finish in the background.
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    report: Dict[str, str] = {}
+    for future, name in futures.items():
+        report[name] = future.result() if future in done else f"timed out after {timeout_s:g}s"
+    duration_s = time.monotonic() - started
+    failures = sum(1 for outcome in report.values() if not outcome.startswith("ok"))
+
+    metrics.observe("warmup.duration_s", duration_s)
+    metrics.incr("warmup.failures", failures)
+    logger.info(
+        f"Warm-up finished in {duration_s:.2f}s ({len(report) - failures}/{len(report)} steps ok): "
+        + "; ".join(f"{name}: {outcome}" for name, outcome in report.items())
+    )
+    return report
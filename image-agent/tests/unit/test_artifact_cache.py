@@ -0,0 +1,108 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from google.adk.artifacts import InMemoryArtifactService
+from google.genai import types
+
+from app.app_utils.artifact_cache import TieredArtifactService
+
+SCOPE = {"app_name": "app", "user_id": "user", "session_id": "session"}
+NAME = "upscaled_photo.png"
+
+
+def _part(data: bytes) -> types.Part:
+    return types.Part.from_bytes(data=data, mime_type="image/png")
+
+
+async def _load(service, **kwargs) -> bytes:
+    return (await service.load_artifact(filename=NAME, **SCOPE, **kwargs)).inline_data.data
+
+
+@pytest.mark.asyncio
+async def test_latest_reflects_saves_from_other_instances():
+    backend = InMemoryArtifactService()
+    first, second = TieredArtifactService(backend), TieredArtifactService(backend)
+
+    await first.save_artifact(filename=NAME, artifact=_part(b"v0"), **SCOPE)
+    assert await _load(first) == b"v0"
+    await second.save_artifact(filename=NAME, artifact=_part(b"v1"), **SCOPE)
+
+    assert await _load(first) == b"v1"
+    assert await _load(first, version=0) == b"v0"
+
+
+@pytest.mark.asyncio
+async def test_latest_is_served_locally_once_cached():
+    backend = InMemoryArtifactService()
+    service = TieredArtifactService(backend)
+    await service.save_artifact(filename=NAME, artifact=_part(b"v0"), **SCOPE)
+
+    assert await _load(service) == b"v0"
+    assert await _load(service) == b"v0"
+    stats = service.stats()
+    assert stats["memory_hits"] == 2
+    assert stats.get("misses", 0) == 0
+    assert stats["version_checks"] == 2
+
+
+@pytest.mark.asyncio
+async def test_save_between_listing_and_load_does_not_poison_cache():
+    class RacingBackend(InMemoryArtifactService):
+        """Another instance saves right after this one's first backend read."""
+
+        race: bool = True
+
+        async def _after_read(self) -> None:
+            if self.race:
+                self.race = False
+                await self.save_artifact(filename=NAME, artifact=_part(b"v1"), **SCOPE)
+
+        async def list_versions(self, **kwargs):
+            versions = await super().list_versions(**kwargs)
+            await self._after_read()
+            return versions
+
+        async def load_artifact(self, **kwargs):
+            artifact = await super().load_artifact(**kwargs)
+            await self._after_read()
+            return artifact
+
+    backend = RacingBackend()
+    await backend.save_artifact(filename=NAME, artifact=_part(b"v0"), **SCOPE)
+    service = TieredArtifactService(backend)
+
+    # Whichever read the save lands after, version 0's bytes must not be
+    # cached as version 1.
+    assert await _load(service) == b"v0"
+    assert await _load(service) == b"v1"
+    assert await _load(service, version=0) == b"v0"
+    assert await _load(service, version=1) == b"v1"
+
+
+@pytest.mark.asyncio
+async def test_missing_artifact():
+    service = TieredArtifactService(InMemoryArtifactService())
+    assert await service.load_artifact(filename="missing.png", **SCOPE) is None
+
+
+@pytest.mark.asyncio
+async def test_delete_forgets_cached_versions():
+    backend = InMemoryArtifactService()
+    service = TieredArtifactService(backend)
+    await service.save_artifact(filename=NAME, artifact=_part(b"v0"), **SCOPE)
+    await service.delete_artifact(filename=NAME, **SCOPE)
+
+    assert await service.load_artifact(filename=NAME, **SCOPE) is None
+    assert service.stats()["memory_entries"] == 0
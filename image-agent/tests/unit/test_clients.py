@@ -0,0 +1,95 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from google import genai
+from google.genai import types
+
+from tools import clients
+
+
+class FakeGenerateHandler(BaseHTTPRequestHandler):
+    """Answers every generateContent call with a one-word text response."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps(
+            {"candidates": [{"content": {"role": "model", "parts": [{"text": "ok"}]}, "finishReason": "STOP"}]}
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def fake_endpoint(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGenerateHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    real_client = genai.Client
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    # A real client and transport, pointed at the fake endpoint instead of Vertex AI.
+    monkeypatch.setattr(
+        clients.genai,
+        "Client",
+        lambda **_: real_client(api_key="test", http_options=types.HttpOptions(base_url=base_url)),
+    )
+    monkeypatch.setattr(clients, "_clients", {})
+    yield
+    server.shutdown()
+    server.server_close()
+
+
+async def _query() -> genai.Client:
+    client = clients.get_genai_client(location="global", project="test-project")
+    response = await client.aio.models.generate_content(model="fake-model", contents="hello")
+    assert response.text == "ok"
+    return client
+
+
+def test_clients_survive_a_fresh_event_loop_per_query(fake_endpoint):
+    # Runner.run (the sync stream_query path) does one asyncio.run per query.
+    first = asyncio.run(_query())
+    second = asyncio.run(_query())
+
+    assert first is not second
+    # The client of the closed loop was dropped, not kept alongside.
+    assert list(clients._clients.values()) == [second]
+
+
+def test_client_is_shared_within_one_loop(fake_endpoint):
+    async def two_queries():
+        return await asyncio.gather(_query(), _query())
+
+    first, second = asyncio.run(two_queries())
+    assert first is second
+
+
+def test_sync_callers_share_one_client(fake_endpoint):
+    assert clients.get_genai_client(location="global", project="p") is clients.get_genai_client(
+        location="global", project="p"
+    )
@@ -0,0 +1,89 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import io
+import time
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from tools import upscale
+
+MODEL_LATENCY_S = 0.5
+CALLS = 6
+
+
+class FakeAsyncModels:
+    """Stands in for client.aio.models: every upscale takes MODEL_LATENCY_S."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def upscale_image(self, model, image, upscale_factor):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(MODEL_LATENCY_S)
+        finally:
+            self.in_flight -= 1
+        return SimpleNamespace(generated_images=[SimpleNamespace(image=SimpleNamespace(image_bytes=image.image_bytes))])
+
+
+class FakeToolContext:
+    def __init__(self):
+        self.saved = {}
+
+    async def save_artifact(self, filename, artifact):
+        self.saved[filename] = artifact
+        return 0
+
+
+def _png(seed: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), (seed, 0, 0)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.mark.asyncio
+async def test_overlapping_upscales_finish_in_about_one_call(tmp_path, monkeypatch):
+    # A model name of its own gives this test fresh rate limiter and region pool state.
+    monkeypatch.setenv("IMAGE_UPSCALE_MODEL", "fake-upscale-concurrency")
+    monkeypatch.setenv("MODEL_RATE_LIMIT_BURST", str(CALLS))
+    monkeypatch.setenv("IMAGE_CACHE_ENABLED", "false")
+    monkeypatch.setenv("IMAGE_PREVIEW_ENABLED", "false")
+    monkeypatch.delenv("IMAGE_DELIVERY_FORMAT", raising=False)
+    models = FakeAsyncModels()
+    monkeypatch.setattr(upscale, "get_genai_client", lambda **_: SimpleNamespace(aio=SimpleNamespace(models=models)))
+
+    paths = []
+    for i in range(CALLS):
+        path = tmp_path / f"source_{i}.png"
+        path.write_bytes(_png(i))  # distinct bytes, so single-flight does not merge calls
+        paths.append(str(path))
+    context = FakeToolContext()
+
+    started = time.monotonic()
+    results = await asyncio.gather(
+        *(upscale.upscale_image(context, image_path=path, scale_factor=2.0) for path in paths)
+    )
+    elapsed = time.monotonic() - started
+
+    assert all(result.startswith("Your image has been upscaled") for result in results), results
+    assert len(context.saved) == CALLS
+    assert models.max_in_flight == CALLS
+    # Serialized calls would take CALLS * MODEL_LATENCY_S (3s).
+    assert elapsed < 2 * MODEL_LATENCY_S
@@ -0,0 +1,169 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+
+import pytest
+
+from app.app_utils.feedback import BatchedFeedbackWriter, LocalFeedbackSink, build_feedback_writer
+
+
+def _entry(i: int) -> dict:
+    return {"score": i, "text": f"feedback {i}"}
+
+
+def _wait_for(condition, timeout_s: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def writers():
+    created = []
+
+    def make(sink, **kwargs) -> BatchedFeedbackWriter:
+        writer = BatchedFeedbackWriter(sink, **kwargs)
+        created.append(writer)
+        return writer
+
+    yield make
+    for writer in created:
+        writer.close(timeout_s=1)
+
+
+class BlockingSink(LocalFeedbackSink):
+    """Holds every write until released, so the buffer can fill up behind it."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.release = threading.Event()
+
+    def write_batch(self, entries):
+        self.release.wait(5)
+        super().write_batch(entries)
+
+
+class FlakySink(LocalFeedbackSink):
+    def __init__(self, failures: int) -> None:
+        super().__init__()
+        self.failures = failures
+
+    def write_batch(self, entries):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("Cloud Logging unavailable")
+        super().write_batch(entries)
+
+
+def test_full_batch_is_written_without_waiting_for_interval(writers):
+    sink = LocalFeedbackSink()
+    writer = writers(sink, max_batch_size=5, flush_interval_s=60)
+
+    for i in range(5):
+        assert writer.submit(_entry(i))
+
+    assert _wait_for(lambda: len(sink.batches) == 1)
+    assert sink.batches[0] == [_entry(i) for i in range(5)]
+
+
+def test_partial_batch_is_written_after_interval(writers):
+    sink = LocalFeedbackSink()
+    writer = writers(sink, max_batch_size=50, flush_interval_s=0.2)
+
+    started = time.monotonic()
+    writer.submit(_entry(1))
+    writer.submit(_entry(2))
+
+    assert _wait_for(lambda: sink.entries == [_entry(1), _entry(2)])
+    assert time.monotonic() - started >= 0.15
+    assert len(sink.batches) == 1
+
+
+def test_batches_respect_max_batch_size(writers):
+    sink = LocalFeedbackSink()
+    writer = writers(sink, max_batch_size=4, flush_interval_s=60)
+
+    for i in range(10):
+        writer.submit(_entry(i))
+    assert writer.flush(timeout_s=2)
+
+    assert sink.entries == [_entry(i) for i in range(10)]
+    assert all(len(batch) <= 4 for batch in sink.batches)
+    assert writer.stats()["written"] == 10
+
+
+def test_drops_and_counts_entries_when_buffer_is_full(writers):
+    sink = BlockingSink()
+    writer = writers(sink, max_batch_size=2, flush_interval_s=60, max_buffered=3)
+
+    writer.submit(_entry(0))
+    writer.submit(_entry(1))
+    # The writer thread takes the first batch and blocks in the sink.
+    assert _wait_for(lambda: writer.stats()["buffered"] == 0)
+    accepted = [writer.submit(_entry(i)) for i in range(2, 8)]
+
+    assert accepted == [True, True, True, False, False, False]
+    assert writer.stats()["dropped"] == 3
+    sink.release.set()
+    assert writer.flush(timeout_s=2)
+    assert sink.entries == [_entry(i) for i in range(5)]
+
+
+def test_write_failure_drops_batch_and_keeps_going(writers):
+    sink = FlakySink(failures=1)
+    writer = writers(sink, max_batch_size=2, flush_interval_s=60)
+
+    writer.submit(_entry(0))
+    writer.submit(_entry(1))
+    assert _wait_for(lambda: writer.stats()["write_errors"] == 1)
+    writer.submit(_entry(2))
+    writer.submit(_entry(3))
+    assert writer.flush(timeout_s=2)
+
+    stats = writer.stats()
+    assert sink.entries == [_entry(2), _entry(3)]
+    assert stats["dropped"] == 2 and stats["written"] == 2
+
+
+def test_close_drains_buffer_and_rejects_new_entries(writers):
+    sink = LocalFeedbackSink()
+    writer = writers(sink, max_batch_size=3, flush_interval_s=60)
+
+    for i in range(7):
+        writer.submit(_entry(i))
+    writer.close(timeout_s=2)
+
+    assert sink.entries == [_entry(i) for i in range(7)]
+    assert not writer._thread.is_alive()
+    assert writer.submit(_entry(99)) is False
+    writer.close()  # idempotent
+
+
+def test_build_feedback_writer_local_sink(monkeypatch):
+    monkeypatch.setenv("FEEDBACK_SINK", "local")
+    monkeypatch.setenv("FEEDBACK_BATCH_SIZE", "7")
+    monkeypatch.setenv("FEEDBACK_FLUSH_INTERVAL_S", "0.5")
+    monkeypatch.setenv("FEEDBACK_MAX_BUFFERED", "21")
+
+    writer = build_feedback_writer(cloud_logger=None)
+    try:
+        assert isinstance(writer.sink, LocalFeedbackSink)
+        assert (writer.max_batch_size, writer.flush_interval_s, writer.max_buffered) == (7, 0.5, 21)
+    finally:
+        writer.close(timeout_s=1)
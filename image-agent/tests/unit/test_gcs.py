@@ -0,0 +1,137 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+
+import pytest
+
+from tools import gcs
+from tools.gcs import read_gcs_object, read_gcs_uri
+
+BUCKET = "test-bucket"
+OBJECTS = {
+    "small.png": b"\x89PNG" + b"s" * 996,
+    "large.bin": bytes(i % 251 for i in range(10_000)),
+    # Metadata claims more bytes than the object really has.
+    "truncated.bin": b"t" * 3_000,
+}
+DECLARED_SIZES = {"truncated.bin": 5_000}
+
+
+class FakeGcsHandler(BaseHTTPRequestHandler):
+    """The slice of the GCS JSON API that Blob.reload and downloads use."""
+
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, headers=None) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        match = re.search(r"/b/([^/]+)/o/([^/?]+)$", url.path)
+        name = unquote(match.group(2)) if match else None
+        if not match or match.group(1) != BUCKET or name not in OBJECTS:
+            self._send(404, json.dumps({"error": {"code": 404, "message": "Not Found"}}).encode())
+            return
+        data = OBJECTS[name]
+        type(self).requests.append((name, self.headers.get("Range")))
+
+        if "alt=media" not in url.query:
+            metadata = {
+                "kind": "storage#object",
+                "bucket": BUCKET,
+                "name": name,
+                "generation": "1",
+                "size": str(DECLARED_SIZES.get(name, len(data))),
+                "contentType": "application/octet-stream",
+            }
+            self._send(200, json.dumps(metadata).encode(), {"Content-Type": "application/json"})
+            return
+
+        range_header = self.headers.get("Range")
+        if not range_header:
+            self._send(200, data)
+            return
+        start, end = (int(value) for value in range_header.removeprefix("bytes=").split("-"))
+        body = data[start:end + 1]
+        self._send(206, body, {"Content-Range": f"bytes {start}-{start + len(body) - 1}/{len(data)}"})
+
+
+@pytest.fixture(scope="module")
+def emulator_host():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGcsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fake_gcs(emulator_host, monkeypatch):
+    monkeypatch.setenv("STORAGE_EMULATOR_HOST", emulator_host)
+    monkeypatch.setenv("GOOGLE_CLOUD_PROJECT", "test-project")
+    monkeypatch.setattr(gcs, "_storage_client", None)
+    FakeGcsHandler.requests = []
+
+
+def _ranges(name: str):
+    return [r for n, r in FakeGcsHandler.requests if n == name and r]
+
+
+@pytest.mark.asyncio
+async def test_small_object_is_one_request():
+    data = await read_gcs_uri(f"gs://{BUCKET}/small.png")
+
+    assert data == OBJECTS["small.png"]
+    assert _ranges("small.png") == []
+
+
+@pytest.mark.asyncio
+async def test_large_object_is_read_in_slices(monkeypatch):
+    monkeypatch.setenv("GCS_SLICE_THRESHOLD", "4096")
+    monkeypatch.setenv("GCS_SLICE_SIZE", "3000")
+    monkeypatch.setenv("GCS_MAX_PARALLEL_SLICES", "2")
+    data = await read_gcs_object(BUCKET, "large.bin")
+
+    assert data == OBJECTS["large.bin"]
+    assert sorted(_ranges("large.bin")) == sorted(
+        ["bytes=0-2999", "bytes=3000-5999", "bytes=6000-8999", "bytes=9000-9999"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_sliced_read_rejects_length_mismatch():
+    with pytest.raises(OSError, match="returned 3000 of 5000 bytes"):
+        await read_gcs_object(BUCKET, "truncated.bin", slice_threshold=1024, slice_size=2000)
+
+
+@pytest.mark.asyncio
+async def test_missing_object():
+    with pytest.raises(FileNotFoundError):
+        await read_gcs_object(BUCKET, "missing.png")
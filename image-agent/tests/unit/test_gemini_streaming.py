@@ -0,0 +1,96 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from types import SimpleNamespace
+
+import pytest
+from google.genai import types
+
+from tools import gemini_image_gen, metrics
+from tools.rate_limit import get_rate_limiter
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+
+
+class QuotaError(Exception):
+    code = 429
+
+
+def _chunk(*parts, finish_reason=None) -> types.GenerateContentResponse:
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=list(parts)), finish_reason=finish_reason)]
+    )
+
+
+class FakeStreamingModels:
+    """Like the real client, the stream only sends its request when first iterated."""
+
+    def __init__(self, throttled_attempts: int):
+        self.throttled_attempts = throttled_attempts
+        self.opened = 0
+        self.requests = 0
+
+    async def generate_content_stream(self, **kwargs):
+        self.opened += 1
+        return self._stream()
+
+    async def _stream(self):
+        self.requests += 1
+        if self.requests <= self.throttled_attempts:
+            raise QuotaError("429 RESOURCE_EXHAUSTED")
+        yield _chunk(types.Part(text="Planning the layout", thought=True))
+        yield _chunk(types.Part(inline_data=types.Blob(data=PNG, mime_type="image/png")))
+        yield _chunk(types.Part(text="Here you go."), finish_reason=types.FinishReason.STOP)
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    monkeypatch.setenv("MODEL_RATE_LIMIT_BACKOFF_S", "0.01")
+    # Keep throttled waits short; the limiter is created on first use.
+    monkeypatch.setenv("MODEL_RATE_LIMIT_QPS", "100")
+    monkeypatch.setenv("MODEL_RATE_LIMIT_MIN_QPS", "50")
+    models = FakeStreamingModels(throttled_attempts=2)
+    monkeypatch.setattr(
+        gemini_image_gen, "get_genai_client", lambda **_: SimpleNamespace(aio=SimpleNamespace(models=models))
+    )
+    return models
+
+
+@pytest.mark.asyncio
+async def test_stream_throttled_on_first_chunk_is_retried(fake_models):
+    limiter = get_rate_limiter(gemini_image_gen.GEMINI_IMAGE_MODEL, "global")
+    rate_before = limiter.rate
+    throttles_before = metrics.snapshot().get("rate_limit.throttle_events", 0)
+    images, thoughts = [], []
+
+    result = await gemini_image_gen._stream_gemini_images(
+        "a cat", "1:1", "1k", on_image=images.append, on_thought=thoughts.append
+    )
+
+    assert fake_models.requests == 3
+    assert metrics.snapshot().get("rate_limit.throttle_events", 0) == throttles_before + 2
+    assert limiter.rate < rate_before  # AIMD backed off
+    assert [image.data for image in result.images] == [PNG]
+    assert images == result.images
+    assert thoughts == ["Planning the layout"]
+    assert result.text == "Here you go."
+
+
+@pytest.mark.asyncio
+async def test_stream_gives_up_after_max_attempts(fake_models, monkeypatch):
+    monkeypatch.setenv("MODEL_RATE_LIMIT_MAX_ATTEMPTS", "2")
+
+    with pytest.raises(QuotaError):
+        await gemini_image_gen._stream_gemini_images("a cat", "1:1", "1k")
+    assert fake_models.requests == 2
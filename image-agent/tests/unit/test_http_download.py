@@ -0,0 +1,161 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import pytest_asyncio
+
+from tools import http_download
+from tools.http_download import DownloadTooLargeError, download_to_bytes
+
+PNG_BODY = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 40
+CHUNK = 1000
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_chunked(self, body: bytes, content_type: str, delay_s: float = 0.0) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for start in range(0, len(body), CHUNK):
+                chunk = body[start:start + CHUNK]
+                self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                self.wfile.flush()
+                time.sleep(delay_s)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up, as the size and timeout tests expect
+
+    def _send_fixed(self, body: bytes, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_GET(self):
+        routes = {
+            "/chunked.png": lambda: self._send_chunked(PNG_BODY, "application/octet-stream"),
+            "/fixed-large": lambda: self._send_fixed(b"x" * 5000, "application/octet-stream"),
+            "/chunked-large": lambda: self._send_chunked(b"x" * 5000, "application/octet-stream"),
+            "/trickle": lambda: self._send_chunked(b"x" * 20 * CHUNK, "application/octet-stream", delay_s=0.1),
+            "/mislabelled": lambda: self._send_fixed(PNG_BODY, "image/jpeg"),
+            "/header-type": lambda: self._send_fixed(b"not magic", "image/jpeg; charset=binary"),
+            "/untyped": lambda: self._send_fixed(b"not magic", "application/octet-stream"),
+        }
+        route = routes.get(self.path)
+        if route is None:
+            self.send_error(404)
+            return
+        route()
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def close_http_client():
+    yield
+    # Release pooled connections before the test's loop goes away.
+    if http_download._http_client_loop is asyncio.get_running_loop():
+        await http_download._http_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_streams_chunked_body(server_url, monkeypatch):
+    monkeypatch.setattr(http_download, "CHUNK_SIZE", 512)
+    result = await download_to_bytes(f"{server_url}/chunked.png")
+
+    assert result.data == PNG_BODY
+    assert result.size == len(PNG_BODY)
+    assert result.mime_type == "image/png"
+
+
+@pytest.mark.asyncio
+async def test_rejects_declared_content_length_over_limit(server_url):
+    with pytest.raises(DownloadTooLargeError, match="5000 bytes"):
+        await download_to_bytes(f"{server_url}/fixed-large", max_bytes=1000)
+
+
+@pytest.mark.asyncio
+async def test_rejects_stream_over_limit(server_url, monkeypatch):
+    monkeypatch.setenv("DOWNLOAD_MAX_BYTES", "2500")
+    with pytest.raises(DownloadTooLargeError, match="exceeded the 2500 byte limit"):
+        await download_to_bytes(f"{server_url}/chunked-large")
+
+
+@pytest.mark.asyncio
+async def test_timeout_covers_whole_transfer(server_url, monkeypatch):
+    # Every chunk arrives well within the read timeout; the transfer as a whole does not.
+    monkeypatch.setenv("DOWNLOAD_TIMEOUT_S", "0.5")
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        await download_to_bytes(f"{server_url}/trickle")
+    assert time.monotonic() - started < 1.5
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "path, filename, expected",
+    [
+        ("/mislabelled", "", "image/png"),  # magic bytes beat the header
+        ("/header-type", "", "image/jpeg"),  # header parameters are stripped
+        ("/untyped", "photo.webp", "image/webp"),  # filename is the last resort
+        ("/untyped", "", "application/octet-stream"),
+    ],
+)
+async def test_content_type_sniffing(server_url, path, filename, expected):
+    result = await download_to_bytes(f"{server_url}{path}", filename=filename)
+    assert result.mime_type == expected
+
+
+def test_pooled_client_survives_a_fresh_event_loop_per_query(server_url):
+    # Runner.run (the sync stream_query path) does one asyncio.run per query.
+    async def download():
+        result = await download_to_bytes(f"{server_url}/chunked.png")
+        assert result.data == PNG_BODY
+        return http_download.get_http_client()
+
+    first = asyncio.run(download())
+    second = asyncio.run(download())
+
+    assert first is not second
+
+
+@pytest.mark.asyncio
+async def test_pooled_client_is_shared_within_one_loop(server_url):
+    await download_to_bytes(f"{server_url}/chunked.png")
+    assert http_download.get_http_client() is http_download.get_http_client()
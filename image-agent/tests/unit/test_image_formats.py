@@ -0,0 +1,66 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+
+import pytest
+from PIL import Image
+
+from tools.image_formats import probe_dimensions
+
+# Odd, non-square sizes so swapped or off-by-one dimensions show up.
+WIDTH, HEIGHT = 37, 23
+
+
+def _encode(mode: str, fmt: str, **params) -> bytes:
+    image = Image.new(mode, (WIDTH, HEIGHT), (200, 80, 40, 128)[: len(mode)])
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, **params)
+    return buffer.getvalue()
+
+
+def _exif() -> Image.Exif:
+    exif = Image.Exif()
+    exif[0x0131] = "image-agent"  # Software
+    return exif
+
+
+ENCODINGS = {
+    "png": (lambda: _encode("RGBA", "PNG"), None),
+    "baseline-jpeg": (lambda: _encode("RGB", "JPEG", quality=90), None),
+    "progressive-jpeg": (lambda: _encode("RGB", "JPEG", quality=90, progressive=True), None),
+    "webp-vp8": (lambda: _encode("RGB", "WEBP", quality=80), b"VP8 "),
+    "webp-vp8l": (lambda: _encode("RGB", "WEBP", lossless=True), b"VP8L"),
+    "webp-vp8x": (lambda: _encode("RGBA", "WEBP", quality=80, exif=_exif()), b"VP8X"),
+}
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_probe_dimensions(encoding):
+    encode, webp_chunk = ENCODINGS[encoding]
+    data = encode()
+    if webp_chunk is not None:
+        assert data[12:16] == webp_chunk  # the encoder produced the variant under test
+
+    assert probe_dimensions(data) == (WIDTH, HEIGHT)
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_probe_dimensions_of_truncated_header(encoding):
+    encode, _ = ENCODINGS[encoding]
+    assert probe_dimensions(encode()[:20]) is None
+
+
+def test_probe_dimensions_of_unknown_format():
+    assert probe_dimensions(b"GIF89a" + b"\x00" * 64) is None
@@ -0,0 +1,35 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from click.testing import CliRunner
+
+from app.app_utils.import_time import main, parse_importtime
+
+
+def test_parse_importtime_skips_header_and_noise():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       119 |        119 | gc\n"
+        "import time:      2048 |      10240 |   app.agent\n"
+        "unrelated warning\n"
+    )
+    assert parse_importtime(stderr) == [(119, 119, " gc"), (2048, 10240, "   app.agent")]
+
+
+def test_agent_engine_imports_within_budget():
+    # Offline, so the check needs no credentials; the budget is IMPORT_TIME_BUDGET_S or 10s.
+    result = CliRunner().invoke(main, ["--offline", "--runs", "1", "--top", "5"])
+
+    assert result.exit_code == 0, result.output
+    assert "Within budget." in result.output
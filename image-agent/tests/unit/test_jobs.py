@@ -0,0 +1,175 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+from google.adk.artifacts import InMemoryArtifactService
+
+from tools import jobs
+from tools.jobs import JobManager, check_image_job, submit_image_job
+
+
+class FakeToolContext:
+    """The parts of ToolContext the job tools use, backed by a real artifact service."""
+
+    def __init__(self, artifact_service, session_id="session"):
+        self._invocation_context = SimpleNamespace(
+            artifact_service=artifact_service,
+            app_name="app",
+            user_id="user",
+            session=SimpleNamespace(id=session_id),
+        )
+        self._scope = {"app_name": "app", "user_id": "user", "session_id": session_id}
+
+    async def load_artifact(self, filename, version=None):
+        return await self._invocation_context.artifact_service.load_artifact(
+            filename=filename, version=version, **self._scope
+        )
+
+    async def list_artifacts(self):
+        return await self._invocation_context.artifact_service.list_artifact_keys(**self._scope)
+
+
+def _job_id(response: str) -> str:
+    return response.split("`")[1]
+
+
+async def _wait_for_jobs(manager: JobManager) -> None:
+    # Jobs run on the manager's own loop thread.
+    await asyncio.wait_for(asyncio.gather(*(asyncio.wrap_future(f) for f in list(manager._tasks.values()))), 1)
+
+
+@pytest.mark.asyncio
+async def test_other_replica_reads_persisted_status(monkeypatch):
+    artifacts = InMemoryArtifactService()
+    context = FakeToolContext(artifacts)
+    release = threading.Event()
+
+    async def run(job_context):
+        await asyncio.to_thread(release.wait, 5)
+        return "Upscaled.", ["upscaled_photo.png"]
+
+    first = JobManager()
+    monkeypatch.setattr(jobs, "_manager", first)
+    job_id = _job_id(submit_image_job(context, "upscale", "photo.png x2", run))
+    await asyncio.sleep(0.05)
+
+    # A second replica has never seen the job.
+    monkeypatch.setattr(jobs, "_manager", JobManager())
+    assert "is running" in await check_image_job(context, job_id)
+
+    release.set()
+    await _wait_for_jobs(first)
+    status = await check_image_job(context, f"`{job_id}`")
+    assert "is done" in status and "upscaled_photo.png" in status
+    listing = await check_image_job(context)
+    assert job_id in listing and "is done" in listing
+
+
+@pytest.mark.asyncio
+async def test_failed_job_is_persisted(monkeypatch):
+    artifacts = InMemoryArtifactService()
+    context = FakeToolContext(artifacts)
+
+    async def run(job_context):
+        raise RuntimeError("model unavailable")
+
+    first = JobManager()
+    monkeypatch.setattr(jobs, "_manager", first)
+    job_id = _job_id(submit_image_job(context, "generate", "a cat", run))
+    await _wait_for_jobs(first)
+
+    monkeypatch.setattr(jobs, "_manager", JobManager())
+    assert "failed. Error: model unavailable" in await check_image_job(context, job_id)
+
+
+@pytest.mark.asyncio
+async def test_jobs_are_scoped_to_their_session(monkeypatch):
+    artifacts = InMemoryArtifactService()
+
+    async def run(job_context):
+        return "Done.", []
+
+    manager = JobManager()
+    monkeypatch.setattr(jobs, "_manager", manager)
+    job_id = _job_id(submit_image_job(FakeToolContext(artifacts), "upscale", "photo.png", run))
+    await _wait_for_jobs(manager)
+
+    other_session = FakeToolContext(artifacts, session_id="other")
+    assert (await check_image_job(other_session, job_id)).startswith("Error: No job")
+    monkeypatch.setattr(jobs, "_manager", JobManager())
+    assert (await check_image_job(other_session, job_id)).startswith("Error: No job")
+    assert await check_image_job(other_session) == "There are no background jobs in this session."
+
+
+@pytest.mark.asyncio
+async def test_persistence_failure_does_not_fail_the_job(monkeypatch):
+    context = FakeToolContext(None)  # saving the status raises
+
+    async def run(job_context):
+        return "Done.", []
+
+    manager = JobManager()
+    monkeypatch.setattr(jobs, "_manager", manager)
+    job_id = _job_id(submit_image_job(context, "upscale", "photo.png", run))
+    await _wait_for_jobs(manager)
+
+    assert manager.get(job_id, ("app", "user", "session")).status == "done"
+
+
+@pytest.mark.asyncio
+async def test_rejects_jobs_over_session_limit(monkeypatch):
+    context = FakeToolContext(InMemoryArtifactService())
+    release = threading.Event()
+
+    async def run(job_context):
+        await asyncio.to_thread(release.wait, 5)
+        return "Done.", []
+
+    manager = JobManager(max_per_session=2)
+    monkeypatch.setattr(jobs, "_manager", manager)
+    for _ in range(2):
+        assert submit_image_job(context, "upscale", "photo.png", run).startswith("Started")
+    assert submit_image_job(context, "upscale", "photo.png", run).startswith("Error: This session already has 2")
+    release.set()
+    await _wait_for_jobs(manager)
+
+
+def test_job_outlives_the_loop_that_queued_it(monkeypatch):
+    # Runner.run (the sync stream_query path) does one asyncio.run per query,
+    # closing the loop while the job is still running.
+    context = FakeToolContext(InMemoryArtifactService())
+    release = threading.Event()
+
+    async def run(job_context):
+        await asyncio.to_thread(release.wait, 5)
+        return "Upscaled.", ["upscaled_photo.png"]
+
+    async def submit():
+        return _job_id(submit_image_job(context, "upscale", "photo.png x2", run))
+
+    manager = JobManager()
+    monkeypatch.setattr(jobs, "_manager", manager)
+    job_id = asyncio.run(submit())
+    release.set()
+
+    async def poll():
+        await _wait_for_jobs(manager)
+        return await check_image_job(context, job_id)
+
+    status = asyncio.run(poll())
+    assert "is done" in status and "upscaled_photo.png" in status
@@ -0,0 +1,113 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gc
+import time
+import uuid
+import weakref
+from types import SimpleNamespace
+
+from google.genai import types
+
+from tools.media_index import SessionMediaIndex, find_media_part, get_session_media_index
+
+EVENTS = 5000
+IMAGE_EVERY = 10
+
+
+def _image_part(name: str) -> types.Part:
+    return types.Part(inline_data=types.Blob(data=b"\x89PNG" + name.encode(), mime_type="image/png", display_name=name))
+
+
+def _synthetic_session(events: int = EVENTS) -> SimpleNamespace:
+    """A session of `events` turns, every IMAGE_EVERY-th carrying an image upload."""
+    session_events = []
+    for i in range(events):
+        parts = [types.Part(text=f"turn {i}")]
+        if i % IMAGE_EVERY == 0:
+            parts.append(_image_part(f"upload_{i}.png"))
+        session_events.append(SimpleNamespace(content=types.Content(role="user", parts=parts)))
+    return SimpleNamespace(id=uuid.uuid4().hex, events=session_events)
+
+
+def test_lookup_matches_linear_scan():
+    session = _synthetic_session()
+    index = get_session_media_index(session)
+
+    assert len(index) == EVENTS // IMAGE_EVERY
+    for name in ("upload_0.png", "upload_2500.png", f"upload_{EVENTS - IMAGE_EVERY}.png", "missing.png"):
+        expected = find_media_part((e.content for e in session.events), name)
+        assert index.lookup(name, session.events) is expected
+
+
+def test_sync_only_walks_new_events():
+    session = _synthetic_session()
+    index = get_session_media_index(session)
+    session.events.append(SimpleNamespace(content=types.Content(role="user", parts=[_image_part("late.png")])))
+
+    assert get_session_media_index(session) is index
+    assert index.lookup("late.png", session.events) is session.events[-1].content.parts[0]
+
+
+def test_replaced_session_is_reindexed():
+    index = SessionMediaIndex()
+    first = _synthetic_session(100).events
+    index.sync(first)
+    replacement = _synthetic_session(100).events
+    replacement[0].content.parts[1] = _image_part("other.png")
+    index.sync(replacement)  # same length, so sync alone cannot tell
+
+    assert index.lookup("upload_0.png", replacement) is None
+    assert index.lookup("other.png", replacement) is replacement[0].content.parts[1]
+
+
+def test_index_does_not_keep_parts_alive():
+    class Part:
+        def __init__(self, name):
+            self.inline_data = SimpleNamespace(display_name=name)
+            self.file_data = None
+
+    part = Part("photo.png")
+    ref = weakref.ref(part)
+    session = SimpleNamespace(id=uuid.uuid4().hex, events=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+    index = get_session_media_index(session)
+    assert index.lookup("photo.png", session.events) is part
+
+    del part, session
+    gc.collect()
+    assert ref() is None
+
+
+def test_benchmark_indexed_lookup_against_linear_scan():
+    session = _synthetic_session()
+    names = [f"upload_{i}.png" for i in range(0, EVENTS, IMAGE_EVERY * 5)] + ["missing.png"]
+
+    started = time.perf_counter()
+    for name in names:
+        find_media_part((e.content for e in session.events), name)
+    linear_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    index = get_session_media_index(session)
+    build_s = time.perf_counter() - started
+    started = time.perf_counter()
+    for name in names:
+        get_session_media_index(session).lookup(name, session.events)
+    indexed_s = time.perf_counter() - started
+
+    report = (
+        f"{EVENTS} events, {len(names)} lookups: linear {linear_s * 1000:.1f}ms, "
+        f"index build {build_s * 1000:.1f}ms, indexed {indexed_s * 1000:.2f}ms ({len(index)} entries)"
+    )
+    assert indexed_s * 10 < linear_s, report
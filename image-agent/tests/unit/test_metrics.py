@@ -0,0 +1,60 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+
+from tools import metrics
+
+
+@pytest.fixture
+def reader(monkeypatch):
+    reader = InMemoryMetricReader()
+    provider = MeterProvider(metric_readers=[reader])
+    monkeypatch.setattr(metrics, "_meter", provider.get_meter("test"))
+    monkeypatch.setattr(metrics, "_otel_instruments", {})
+    monkeypatch.setattr(metrics, "_gauges", {})
+    monkeypatch.setattr(metrics, "_gauge_points", {})
+    yield reader
+    provider.shutdown()
+
+
+def _exported(reader) -> dict:
+    points = {}
+    for resource_metrics in reader.get_metrics_data().resource_metrics:
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                for point in metric.data.data_points:
+                    points[(metric.name, tuple(sorted(point.attributes.items())))] = point.value
+    return points
+
+
+def test_gauges_are_exported_to_otel(reader):
+    metrics.set_gauge("jobs.active", 3)
+    metrics.set_gauge("rate_limit.queue_depth", 5, limiter="model@global")
+    metrics.set_gauge("rate_limit.queue_depth", 1, limiter="model@us-central1")
+    metrics.set_gauge("rate_limit.queue_depth", 0, limiter="model@global")
+
+    assert _exported(reader) == {
+        ("jobs.active", ()): 3,
+        ("rate_limit.queue_depth", (("limiter", "model@global"),)): 0,
+        ("rate_limit.queue_depth", (("limiter", "model@us-central1"),)): 1,
+    }
+
+
+def test_gauge_attributes_are_part_of_the_snapshot_name(reader):
+    metrics.set_gauge("rate_limit.rate", 2.5, limiter="model@global")
+
+    assert metrics.snapshot("rate_limit.rate.") == {"rate_limit.rate.model@global": 2.5}
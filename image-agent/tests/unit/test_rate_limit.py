@@ -0,0 +1,58 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+import time
+
+from tools.rate_limit import AdaptiveTokenBucket
+
+
+def _bucket(rate: float) -> AdaptiveTokenBucket:
+    return AdaptiveTokenBucket("test", rate=rate, burst=1, min_rate=1, max_rate=rate, increase_step=1)
+
+
+def test_contended_bursts_in_separate_event_loops():
+    # Runner.run (the sync stream_query path) does one asyncio.run per query,
+    # so the same limiter sees a new loop on every query.
+    bucket = _bucket(rate=50.0)
+
+    async def burst():
+        await asyncio.gather(*(bucket.acquire() for _ in range(3)))
+
+    started = time.monotonic()
+    asyncio.run(burst())
+    asyncio.run(burst())
+
+    # Five of the six requests had to wait for a token at 50 requests/s.
+    assert time.monotonic() - started >= 5 / 50 * 0.9
+
+
+
+def test_bursts_from_concurrent_event_loop_threads_share_the_rate():
+    # Serving loops and the background job loop run in different threads.
+    bucket = _bucket(rate=50.0)
+
+    async def burst():
+        await asyncio.gather(*(bucket.acquire() for _ in range(3)))
+
+    threads = [threading.Thread(target=asyncio.run, args=(burst(),)) for _ in range(2)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert time.monotonic() - started >= 5 / 50 * 0.9
+    assert bucket._waiting == 0
@@ -0,0 +1,189 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import pytest
+
+from tools import metrics
+from tools.regions import RegionPool
+
+
+class ApiError(Exception):
+    def __init__(self, code: int):
+        super().__init__(f"{code} error")
+        self.code = code
+
+
+class FakeModel:
+    """A per-region stand-in that injects latency and faults and logs every call."""
+
+    def __init__(self, latency_s=None, errors=None):
+        self.latency_s = latency_s or {}
+        self.errors = errors or {}
+        self.calls = []
+        self.cancelled = []
+
+    async def __call__(self, region: str) -> str:
+        self.calls.append(region)
+        try:
+            await asyncio.sleep(self.latency_s.get(region, 0.0))
+        except asyncio.CancelledError:
+            self.cancelled.append(region)
+            raise
+        error = self.errors.get(region)
+        if error is not None:
+            raise error
+        return f"ok from {region}"
+
+
+@pytest.mark.asyncio
+async def test_fails_over_on_server_error():
+    pool = RegionPool("model", ["us-central1", "europe-west4"])
+    model = FakeModel(errors={"us-central1": ApiError(503)})
+
+    assert await pool.call(model) == "ok from europe-west4"
+    assert model.calls == ["us-central1", "europe-west4"]
+    assert pool.stats["us-central1"].consecutive_failures == 1
+
+
+@pytest.mark.asyncio
+async def test_fails_over_on_timeout():
+    pool = RegionPool("model", ["us-central1", "europe-west4"], timeout_s=0.05)
+    model = FakeModel(latency_s={"us-central1": 1.0})
+
+    assert await pool.call(model) == "ok from europe-west4"
+    assert model.calls == ["us-central1", "europe-west4"]
+
+
+@pytest.mark.asyncio
+async def test_does_not_fail_over_on_client_error():
+    pool = RegionPool("model", ["us-central1", "europe-west4"])
+    model = FakeModel(errors={"us-central1": ApiError(400)})
+
+    with pytest.raises(ApiError):
+        await pool.call(model)
+    assert model.calls == ["us-central1"]
+    # A bad request says nothing about the region's health.
+    assert pool.stats["us-central1"].consecutive_failures == 0
+
+
+@pytest.mark.asyncio
+async def test_raises_last_error_when_every_region_fails():
+    pool = RegionPool("model", ["us-central1", "europe-west4"])
+    model = FakeModel(errors={"us-central1": ApiError(500), "europe-west4": ApiError(503)})
+
+    with pytest.raises(ApiError, match="503"):
+        await pool.call(model)
+
+
+@pytest.mark.asyncio
+async def test_cooldown_after_failure_threshold():
+    pool = RegionPool("model", ["us-central1", "europe-west4"], timeout_s=1, failure_threshold=2, cooldown_s=60)
+    model = FakeModel(errors={"us-central1": ApiError(503)})
+
+    for _ in range(2):
+        with pytest.raises(ApiError):
+            await pool.call_in("us-central1", model)
+    assert pool.stats["us-central1"].cooldown_until > 0
+
+    # The configured favourite now goes last, even though it still scores better.
+    pool.stats["europe-west4"].record(5.0, ok=True)
+    assert pool.ranked_regions() == ["europe-west4", "us-central1"]
+    model.calls.clear()
+    assert await pool.call(model) == "ok from europe-west4"
+    assert model.calls == ["europe-west4"]
+
+
+@pytest.mark.asyncio
+async def test_cooldown_expires():
+    pool = RegionPool("model", ["us-central1", "europe-west4"], timeout_s=1, failure_threshold=1, cooldown_s=0.05)
+    pool.record("europe-west4", 5.0, ok=True)
+    model = FakeModel(errors={"us-central1": ApiError(503)})
+    with pytest.raises(ApiError):
+        await pool.call_in("us-central1", model)
+    # Still scores better than the 5s region, but sits out its cooldown.
+    assert pool.ranked_regions() == ["europe-west4", "us-central1"]
+
+    await asyncio.sleep(0.1)
+    assert pool.ranked_regions() == ["us-central1", "europe-west4"]
+
+
+@pytest.mark.asyncio
+async def test_ranks_regions_by_latency_ewma():
+    pool = RegionPool("model", ["us-central1", "europe-west4", "asia-northeast1"])
+    model = FakeModel(latency_s={"us-central1": 0.06, "europe-west4": 0.0, "asia-northeast1": 0.03})
+
+    # Unsampled regions keep their configured order.
+    assert pool.ranked_regions() == ["us-central1", "europe-west4", "asia-northeast1"]
+    for region in pool.regions:
+        await pool.call_in(region, model)
+    assert pool.ranked_regions() == ["europe-west4", "asia-northeast1", "us-central1"]
+
+    model.calls.clear()
+    await pool.call(model)
+    assert model.calls == ["europe-west4"]
+
+
+def test_errors_outweigh_latency_in_ranking():
+    pool = RegionPool("model", ["us-central1", "europe-west4"], timeout_s=10)
+    for _ in range(5):
+        pool.record("us-central1", 0.1, ok=True)
+        pool.record("europe-west4", 0.5, ok=True)
+    assert pool.ranked_regions()[0] == "us-central1"
+
+    # Fast failures must not make a region look healthy.
+    pool.record("us-central1", 0.01, ok=False)
+    assert pool.ranked_regions()[0] == "europe-west4"
+
+
+@pytest.mark.asyncio
+async def test_hedge_wins_when_primary_is_slow():
+    pool = RegionPool("model", ["us-central1", "europe-west4"])
+    model = FakeModel(latency_s={"us-central1": 1.0})
+    won_before = metrics.snapshot().get("hedge.won", 0)
+
+    result = await pool.hedged_call(model, min_delay_s=0.01, default_delay_s=0.05)
+    await asyncio.sleep(0.01)  # let the cancellation reach the losing attempt
+
+    assert result == "ok from europe-west4"
+    assert model.calls == ["us-central1", "europe-west4"]
+    assert model.cancelled == ["us-central1"]
+    assert metrics.snapshot().get("hedge.won", 0) == won_before + 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_raises_primary_error_when_both_regions_fail():
+    pool = RegionPool("model", ["us-central1", "europe-west4"])
+    model = FakeModel(
+        latency_s={"us-central1": 0.1},
+        errors={"us-central1": ApiError(503), "europe-west4": ApiError(500)},
+    )
+
+    # The hedge fails first; the primary's error is the one surfaced.
+    with pytest.raises(ApiError, match="503"):
+        await pool.hedged_call(model, min_delay_s=0.01, default_delay_s=0.02)
+    assert model.calls == ["us-central1", "europe-west4"]
+
+
+@pytest.mark.asyncio
+async def test_client_error_is_not_hedged():
+    pool = RegionPool("model", ["us-central1", "europe-west4"])
+    model = FakeModel(errors={"us-central1": ApiError(400)})
+    fired_before = metrics.snapshot().get("hedge.fired", 0)
+
+    with pytest.raises(ApiError, match="400"):
+        await pool.hedged_call(model, min_delay_s=0.01, default_delay_s=0.05)
+    assert model.calls == ["us-central1"]
+    assert metrics.snapshot().get("hedge.fired", 0) == fired_before
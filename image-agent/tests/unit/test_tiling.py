@@ -0,0 +1,135 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from tools import upscale
+from tools.tiling import split_tiles, stitch_tiles, tile_grid, tile_size_for
+from tools.upscale import UpscalePlan, plan_upscale
+
+
+def _encode(image: Image.Image) -> bytes:
+    out = io.BytesIO()
+    image.save(out, format="PNG")
+    return out.getvalue()
+
+
+def _noise(width: int, height: int, mode: str = "RGB") -> Image.Image:
+    rng = np.random.default_rng(0)
+    return Image.fromarray(rng.integers(0, 256, (height, width, len(mode)), dtype=np.uint8))
+
+
+def _fake_upscale(data: bytes, multiplier: int) -> bytes:
+    """A deterministic stand-in for the model: NEAREST keeps every pixel exact."""
+    with Image.open(io.BytesIO(data)) as image:
+        return _encode(image.resize((image.width * multiplier, image.height * multiplier), Image.Resampling.NEAREST))
+
+
+def _max_error(a: bytes, b: bytes) -> int:
+    with Image.open(io.BytesIO(a)) as first, Image.open(io.BytesIO(b)) as second:
+        assert first.mode == second.mode and first.size == second.size
+        return int(np.abs(np.asarray(first, dtype=np.int16) - np.asarray(second, dtype=np.int16)).max())
+
+
+def test_tile_size_fits_output_limit():
+    tile = tile_size_for(4, 17_000_000)
+    assert (tile * 4) ** 2 <= 17_000_000 < ((tile + 1) * 4) ** 2
+
+
+@pytest.mark.parametrize("width, height, tile, overlap", [(100, 70, 40, 8), (40, 40, 40, 8), (101, 33, 32, 15)])
+def test_tile_grid_covers_image_with_overlap(width, height, tile, overlap):
+    boxes = tile_grid(width, height, tile, overlap)
+
+    covered = np.zeros((height, width), dtype=np.int32)
+    for left, top, right, bottom in boxes:
+        assert 0 <= left < right <= width and 0 <= top < bottom <= height
+        assert right - left <= tile and bottom - top <= tile
+        covered[top:bottom, left:right] += 1
+    assert covered.min() >= 1
+
+    lefts = sorted({box[0] for box in boxes})
+    rights = sorted({box[2] for box in boxes})
+    for right, next_left in zip(rights, lefts[1:]):
+        assert right - next_left >= overlap
+
+
+def test_tile_grid_rejects_overlap_too_large():
+    with pytest.raises(ValueError):
+        tile_grid(100, 100, 20, 10)
+
+
+@pytest.mark.parametrize("mode", ["RGB", "RGBA"])
+def test_split_upscale_stitch_matches_whole_image(mode):
+    source = _encode(_noise(90, 61, mode))
+    boxes = tile_grid(90, 61, 32, 8)
+    assert len(boxes) > 4
+
+    tiles = split_tiles(source, boxes)
+    upscaled = [_fake_upscale(tile, 2) for tile in tiles]
+    stitched = stitch_tiles(upscaled, boxes, 2, (90, 61), 8)
+
+    assert _max_error(stitched, _fake_upscale(source, 2)) == 0
+
+
+def test_stitch_resizes_off_by_one_tiles():
+    source = _encode(_noise(64, 64))
+    boxes = tile_grid(64, 64, 40, 8)
+    upscaled = []
+    for tile in split_tiles(source, boxes):
+        with Image.open(io.BytesIO(_fake_upscale(tile, 2))) as image:
+            upscaled.append(_encode(image.crop((0, 0, image.width - 1, image.height))))
+
+    with Image.open(io.BytesIO(stitch_tiles(upscaled, boxes, 2, (64, 64), 8))) as stitched:
+        assert stitched.size == (128, 128)
+
+
+@pytest.mark.asyncio
+async def test_upscale_planned_tiles_oversized_input(monkeypatch):
+    monkeypatch.setenv("IMAGE_UPSCALE_MAX_OUTPUT_PIXELS", str(64 * 64))
+    monkeypatch.setenv("IMAGE_UPSCALE_TILED_MAX_OUTPUT_PIXELS", str(200 * 200))
+    monkeypatch.setenv("IMAGE_UPSCALE_TILE_OVERLAP", "4")
+    calls = []
+
+    async def fake_upscale_with_cache(data: bytes, factor: str) -> bytes:
+        calls.append(factor)
+        return _fake_upscale(data, 2)
+
+    monkeypatch.setattr(upscale, "upscale_with_cache", fake_upscale_with_cache)
+    source = _encode(_noise(80, 50, "RGBA"))
+    plan = plan_upscale(source, 4.0)
+
+    assert plan.tiled and plan.factor == "x2"
+    result = await upscale.upscale_planned(source, plan)
+    assert len(calls) == len(tile_grid(80, 50, tile_size_for(2, 64 * 64), 4))
+    assert _max_error(result, _fake_upscale(source, 2)) == 0
+
+
+def test_describe_names_the_limit_that_applied(monkeypatch):
+    monkeypatch.setenv("IMAGE_UPSCALE_MAX_OUTPUT_PIXELS", "17000000")
+    monkeypatch.setenv("IMAGE_UPSCALE_TILED_MAX_OUTPUT_PIXELS", "40000000")
+
+    untiled = UpscalePlan(factor="x2", requested_factor="x4", input_size=(1500, 1500))
+    assert untiled.describe().endswith("reduced from x4 to stay within the 17 MP output limit")
+
+    tiled = UpscalePlan(factor="x2", requested_factor="x4", input_size=(2449, 2449), tiled=True)
+    assert tiled.describe() == (
+        "2449x2449 -> 4898x4898 (x2, tiled), reduced from x4 to stay within the 40 MP tiled output limit"
+    )
+    assert UpscalePlan(factor="x2", requested_factor="x2", input_size=(3000, 2000), tiled=True).describe() == (
+        "3000x2000 -> 6000x4000 (x2, tiled)"
+    )